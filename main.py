@@ -1,36 +1,505 @@
+import time
+STARTED_AT = time.perf_counter()  # start of the import, for --profile-startup
+
 import sys
 import math
 import random
+import os
+# The pygame banner would come before the JSON reports on stdout
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
 import pygame
 import json
-import os
-from PIL import Image, ImageDraw, ImageFont
+import marshal
+import mmap
+import hashlib
+import re
+import bisect
+import unicodedata
+import sqlite3
+import threading
+import queue
+import argparse
+import tempfile
+import struct
+import shutil
+import warnings
+import gc
+import tracemalloc
+from array import array
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11, content packs must be JSON
+    tomllib = None
+
+# PIL is imported by load_pil() on first use, usually on the font loading thread
+Image = ImageDraw = ImageFont = None
+# numpy is optional; load_numpy() imports it while the menu waits for input
+numpy = None
+
+
+def load_pil():
+    global Image, ImageDraw, ImageFont
+    if ImageFont is None:
+        from PIL import Image as pil_image, ImageDraw as pil_draw, ImageFont as pil_font
+        Image, ImageDraw = pil_image, pil_draw
+        ImageFont = pil_font  # assigned last: it marks the import as done
+
+
+def load_numpy():
+    """Import numpy if it is installed; without it the asteroids move in plain Python"""
+    global numpy
+    if numpy is None:
+        try:
+            import numpy as numpy_module
+        except ImportError:
+            return
+        numpy = numpy_module
+
+# Surfaces, images and pixel buffers created by the game, by kind (see --benchmark);
+# --trace-allocations measures every Python allocation with tracemalloc
+ALLOCATIONS = Counter()
+
+
+class SurfacePool:
+    """Free pixel surfaces bucketed by size, handed out as exact-size subsurfaces.
+
+    Sizes are rounded up to a bucket, so texts of similar length share
+    surfaces; reusing one only creates the small subsurface object, not
+    new pixels.
+    """
+    def __init__(self, flags=pygame.SRCALPHA, max_free_bytes=4 * 1024 * 1024):
+        self.flags = flags
+        self.max_free_bytes = max_free_bytes
+        self.free = {}  # bucket size -> surfaces
+        self.free_bytes = 0
+        self.reuses = 0
+
+    @staticmethod
+    def bucket(width, height):
+        return (max(32, (width + 31) // 32 * 32), max(16, (height + 15) // 16 * 16))
+
+    def acquire(self, width, height):
+        size = self.bucket(width, height)
+        surfaces = self.free.get(size)
+        if surfaces:
+            parent = surfaces.pop()
+            self.free_bytes -= parent.get_pitch() * parent.get_height()
+            self.reuses += 1
+        else:
+            parent = pygame.Surface(size, self.flags)
+            ALLOCATIONS["surface"] += 1
+        return parent.subsurface((0, 0, width, height))
+
+    def release(self, surface):
+        """Give back a surface from acquire(); the caller must not use it afterwards"""
+        parent = surface.get_parent()
+        if parent is None:
+            return
+        size = parent.get_size()
+        parent_bytes = parent.get_pitch() * parent.get_height()
+        if size != self.bucket(*size) or self.free_bytes + parent_bytes > self.max_free_bytes:
+            return
+        self.free.setdefault(size, []).append(parent)
+        self.free_bytes += parent_bytes
+
+# Glyph atlas used by FontWrapper
+class GlyphAtlas:
+    """Caches rasterized glyphs of one PIL font in a single pygame surface.
+
+    Glyphs are stored as black coverage masks packed on shelves. A string is
+    composed on a surface pre-filled with the text color at zero alpha, so a
+    BLEND_RGBA_MAX blit of each glyph only contributes its coverage.
+    """
+    def __init__(self, font, width=1024, height=256):
+        self.font = font
+        self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        self.glyphs = {}      # char -> (atlas rect or None, bbox)
+        self.advances = {}    # (char, next char) -> advance including kerning
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def _grow(self, min_height):
+        """Double the atlas height, keeping the already packed glyphs"""
+        width, height = self.surface.get_size()
+        while height < min_height:
+            height *= 2
+        surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        surface.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        self.surface = surface
+
+    def _pack(self, w, h):
+        """Reserve a w x h area on the current shelf, opening a new one if needed"""
+        width = self.surface.get_width()
+        if self.shelf_x + w + 1 > width:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height + 1
+            self.shelf_height = 0
+        if self.shelf_y + h + 1 > self.surface.get_height():
+            self._grow(self.shelf_y + h + 1)
+        rect = pygame.Rect(self.shelf_x, self.shelf_y, w, h)
+        self.shelf_x += w + 1
+        self.shelf_height = max(self.shelf_height, h)
+        return rect
+
+    def glyph(self, char):
+        """Return (atlas rect, bbox) for a character, rasterizing it on first use"""
+        entry = self.glyphs.get(char)
+        if entry is not None:
+            return entry
+
+        bbox = self.font.getbbox(char)
+        w = bbox[2] - bbox[0]
+        h = bbox[3] - bbox[1]
+        rect = None
+        if w > 0 and h > 0:
+            mask = Image.new('L', (w, h), 0)
+            ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), char, font=self.font, fill=255)
+            black = Image.new('L', (w, h), 0)
+            pil_glyph = Image.merge('RGBA', (black, black, black, mask))
+            glyph_surface = pygame.image.frombuffer(pil_glyph.tobytes(), (w, h), 'RGBA')
+            rect = self._pack(w, h)
+            self.surface.blit(glyph_surface, rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+        entry = (rect, bbox)
+        self.glyphs[char] = entry
+        return entry
+
+    def advance(self, char, next_char):
+        """Horizontal pen advance after char, including kerning with next_char"""
+        key = (char, next_char)
+        adv = self.advances.get(key)
+        if adv is None:
+            if next_char:
+                adv = self.font.getlength(char + next_char) - self.font.getlength(next_char)
+            else:
+                adv = self.font.getlength(char)
+            self.advances[key] = adv
+        return adv
+
+    def layout(self, text):
+        """Return the pen position of every character and the text box.
+
+        Like PIL's getbbox, the box spans from the pen origin to the end of
+        the last advance, widened to any ink outside that, so leading and
+        trailing spaces keep their width.
+        """
+        positions = []
+        pen = 0.0
+        left = 0
+        top = float('inf')
+        right = bottom = float('-inf')
+        for i, char in enumerate(text):
+            rect, bbox = self.glyph(char)
+            x = int(round(pen))
+            positions.append((x, rect, bbox))
+            if rect is not None:
+                left = min(left, x + bbox[0])
+                right = max(right, x + bbox[2])
+                top = min(top, bbox[1])
+                bottom = max(bottom, bbox[3])
+            next_char = text[i + 1] if i + 1 < len(text) else ''
+            pen += self.advance(char, next_char)
+        right = max(right, int(round(pen)))
+        if top == float('inf'):
+            # Only whitespace
+            top, bottom = 0, 0
+        return positions, (left, top, right, bottom)
+
+    def measure(self, text):
+        """Size of the surface render() returns, without building the layout"""
+        glyphs = self.glyphs
+        advances = self.advances
+        pen = 0.0
+        left = 0
+        top = float('inf')
+        right = bottom = float('-inf')
+        for i, char in enumerate(text):
+            entry = glyphs.get(char) or self.glyph(char)
+            rect, bbox = entry
+            if rect is not None:
+                x = int(round(pen))
+                left = min(left, x + bbox[0])
+                right = max(right, x + bbox[2])
+                top = min(top, bbox[1])
+                bottom = max(bottom, bbox[3])
+            next_char = text[i + 1] if i + 1 < len(text) else ''
+            adv = advances.get((char, next_char))
+            pen += adv if adv is not None else self.advance(char, next_char)
+        right = max(right, int(round(pen)))
+        if top == float('inf'):
+            top, bottom = 0, 0
+        return (right - left + 10, bottom - top + 10)
+
+    def render(self, text, color, pool=None):
+        positions, (left, top, right, bottom) = self.layout(text)
+        size = (right - left + 10, bottom - top + 10)
+        if pool is not None:
+            surface = pool.acquire(*size)
+        else:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            ALLOCATIONS["surface"] += 1
+        surface.fill(tuple(color[:3]) + (0,))
+        # Same placement as drawing the whole string at (5, 5) with PIL
+        surface.blits([(self.surface, (5 + x + bbox[0], 5 + bbox[1]), rect,
+                        pygame.BLEND_RGBA_MAX)
+                       for x, rect, bbox in positions if rect is not None], doreturn=False)
+        return surface
+
+
+# Cache of rendered text surfaces shared by all FontWrappers
+VOLATILE_TEXT_ENTRIES = 32  # timer, score and typed strings kept apart from the labels
+
+class TextSurfaceCache:
+    """LRU cache of text surfaces bounded by total pixel bytes.
+
+    Entries start in a probation segment and move to a protected segment on
+    their second hit. Text the caller marks volatile (timers, scores,
+    counters, text being typed) is drawn for many frames and then never
+    again, so it skips both and lives in a small LRU of its own; static
+    labels are never evicted by it.
+
+    Evicted surfaces go back to the pool at the end of the frame (recycle()),
+    so ones handed out earlier in the frame stay intact until they are drawn.
+    Callers that hold on to surfaces across frames mark them kept, and those
+    are never recycled.
+    """
+    def __init__(self, max_bytes=8 * 1024 * 1024, protected_ratio=0.8, pool=None,
+                 volatile_entries=VOLATILE_TEXT_ENTRIES):
+        self.pool = pool  # evicted surfaces that were not kept go back here
+        self.kept = set()  # keys whose surfaces a caller holds across frames
+        self.retired = []  # evicted this frame, recycled by recycle()
+        self.max_bytes = max_bytes
+        self.max_protected_bytes = int(max_bytes * protected_ratio)
+        self.probation = OrderedDict()
+        self.protected = OrderedDict()
+        self.volatile = OrderedDict()
+        self.volatile_entries = volatile_entries
+        self.volatile_bytes = 0
+        self.probation_bytes = 0
+        self.protected_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def surface_bytes(surface):
+        return surface.get_pitch() * surface.get_height()
+
+    def get(self, key, volatile=False, keep=False):
+        if keep:
+            self.kept.add(key)
+        if volatile:
+            surface = self.volatile.get(key)
+            if surface is None:
+                self.misses += 1
+                return None
+            self.volatile.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        surface = self.protected.get(key)
+        if surface is not None:
+            self.protected.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        surface = self.probation.pop(key, None)
+        if surface is not None:
+            # Second use: promote to the protected segment
+            size = self.surface_bytes(surface)
+            self.probation_bytes -= size
+            self.protected[key] = surface
+            self.protected_bytes += size
+            while self.protected_bytes > self.max_protected_bytes and len(self.protected) > 1:
+                old_key, old_surface = self.protected.popitem(last=False)
+                old_size = self.surface_bytes(old_surface)
+                self.protected_bytes -= old_size
+                # Demoted entries get another chance in probation
+                self.probation[old_key] = old_surface
+                self.probation_bytes += old_size
+            self._evict()
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        return None
+
+    def put(self, key, surface, volatile=False, keep=False):
+        if keep:
+            self.kept.add(key)
+        size = self.surface_bytes(surface)
+        if volatile:
+            self.volatile[key] = surface
+            self.volatile_bytes += size
+            while len(self.volatile) > self.volatile_entries:
+                old_key, old_surface = self.volatile.popitem(last=False)
+                self.volatile_bytes -= self.surface_bytes(old_surface)
+                self._retire(old_key, old_surface)
+            return
+        if size > self.max_bytes:
+            return
+        self.probation[key] = surface
+        self.probation_bytes += size
+        self._evict()
+
+    def _evict(self):
+        while self.probation_bytes + self.protected_bytes > self.max_bytes and self.probation:
+            key, surface = self.probation.popitem(last=False)
+            self.probation_bytes -= self.surface_bytes(surface)
+            self._retire(key, surface)
+
+    def _retire(self, key, surface):
+        self.evictions += 1
+        if key in self.kept:
+            # Its holder keeps drawing it, so the pixels are left alone
+            self.kept.discard(key)
+        elif self.pool is not None:
+            self.retired.append(surface)
+
+    def recycle(self):
+        """Return the surfaces evicted during the frame to the pool; call once it is presented"""
+        for surface in self.retired:
+            self.pool.release(surface)
+        self.retired.clear()
+
+    def clear(self):
+        self.probation.clear()
+        self.protected.clear()
+        self.volatile.clear()
+        self.kept.clear()
+        self.retired.clear()
+        self.volatile_bytes = 0
+        self.probation_bytes = 0
+        self.protected_bytes = 0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.probation) + len(self.protected) + len(self.volatile),
+            "bytes": self.probation_bytes + self.protected_bytes + self.volatile_bytes,
+        }
+
+
+FONT_PATHS = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+)
+
+
+def load_font(size):
+    """Load the game font at size, falling back to PIL's built-in font"""
+    load_pil()
+    for path in FONT_PATHS:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default()
+    except (OSError, ImportError):
+        return None
 
-# Initialize Pygame
-pygame.init()
 
 # Font renderer using PIL/Pillow
 class FontWrapper:
-    """Text renderer using PIL/Pillow for proper font rendering"""
-    def __init__(self, size):
+    """Text renderer using PIL/Pillow fonts and a per-size glyph atlas.
+
+    Given an executor, the font is loaded in the background and the first
+    use waits for it; ready() tells whether that would block.
+    """
+    pool = SurfacePool()
+    cache = TextSurfaceCache(pool=pool)
+    empty = None
+
+    def __init__(self, size, executor=None):
         self.size = size
-        try:
-            # Try to load a default system font
-            self.font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", size)
-        except:
-            try:
-                self.font = ImageFont.truetype("/usr/share/fonts/TTF/DejaVuSans-Bold.ttf", size)
-            except:
-                try:
-                    # Fallback to basic font
-                    self.font = ImageFont.load_default()
-                except:
-                    self.font = None
+        self.pending = executor.submit(load_font, size) if executor else None
+        self._font = None
+        self._atlas = None
+        if self.pending is None:
+            self._set_font(load_font(size))
+
+    def _set_font(self, font):
+        self._font = font
+        # Bitmap fallback fonts have no kerning metrics, so they keep the PIL path
+        if font and hasattr(font, 'getbbox') and hasattr(font, 'getlength'):
+            self._atlas = GlyphAtlas(font)
+
+    def ready(self):
+        return self.pending is None or self.pending.done()
+
+    def _resolve(self):
+        if self.pending is not None:
+            font = self.pending.result()
+            self.pending = None
+            self._set_font(font)
+
+    @property
+    def font(self):
+        self._resolve()
+        return self._font
+
+    @property
+    def atlas(self):
+        self._resolve()
+        return self._atlas
+
+    def render(self, text, antialias, color, volatile=False, keep=False):
+        """Cached text surface.
+
+        volatile is for text that changes while shown (timers, typing); keep
+        is for callers that hold the surface across frames (layouts), so it
+        is never recycled for other text.
+        """
+        if not text:
+            if FontWrapper.empty is None:
+                FontWrapper.empty = pygame.Surface((1, 1), pygame.SRCALPHA)
+            return FontWrapper.empty
+
+        # Returned surfaces are shared, callers only blit them
+        key = (text, self.size, tuple(color))
+        surface = self.cache.get(key, volatile, keep)
+        if surface is not None:
+            return surface
+
+        if PROFILER.enabled:
+            start = time.perf_counter()
+        surface = self.render_uncached(text, color)
+        if PROFILER.enabled:
+            PROFILER.add("text_render", start, time.perf_counter())
+        self.cache.put(key, surface, volatile, keep)
+        return surface
+
+    def render_uncached(self, text, color):
+        """Rasterize text without going through the shared cache.
 
-    def render(self, text, antialias, color):
+        Atlas renders come from the surface pool; a caller that is done with
+        the surface within the frame can hand it back with pool.release().
+        """
+        if self.atlas:
+            return self.atlas.render(text, color, self.pool)
+        return self.render_pil(text, color)
+
+    def measure(self, text):
+        """Size of the surface render() would return, from font metrics only"""
         if not text:
-            return pygame.Surface((1, 1), pygame.SRCALPHA)
+            return (1, 1)
+        if self.atlas:
+            return self.atlas.measure(text)
+        if self.font and hasattr(self.font, 'getbbox'):
+            bbox = self.font.getbbox(text)
+            return (bbox[2] - bbox[0] + 10, bbox[3] - bbox[1] + 10)
+        return (len(text) * (self.size // 2) + 20, self.size + 10)
 
+    def render_pil(self, text, color):
+        """Rasterize the whole string with PIL (used when no atlas is available)"""
         # Get text size
         if self.font and hasattr(self.font, 'getbbox'):
             bbox = self.font.getbbox(text)
@@ -42,6 +511,7 @@ class FontWrapper:
 
         # Create PIL image
         pil_image = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+        ALLOCATIONS["pil_image"] += 1
         draw = ImageDraw.Draw(pil_image)
 
         # Draw text
@@ -51,19 +521,19 @@ class FontWrapper:
             # Fallback if no font available
             draw.text((5, 5), text, fill=color)
 
-        # Convert PIL image to pygame surface
-        mode = pil_image.mode
-        size = pil_image.size
+        # Wrap the pixels in a surface without copying them again
         data = pil_image.tobytes()
-
-        surface = pygame.image.fromstring(data, size, mode)
-
-        return surface
+        ALLOCATIONS["buffer"] += 1
+        return pygame.image.frombuffer(data, pil_image.size, pil_image.mode)
 
 # Constants
-SCREEN_WIDTH = 1024
+SCREEN_WIDTH = 1024   # every screen is laid out on a canvas of this size
 SCREEN_HEIGHT = 768
 FPS = 60
+SIM_DT = 1 / 60        # fixed simulation step in seconds
+MAX_FRAME_TIME = 0.25  # longer frames are clamped so the simulation cannot spiral
+IDLE_TIMEOUT = 1000  # ms to sleep on static screens when nothing happens
+FONT_WAIT_TIMEOUT = 20  # ms to sleep between checks while the fonts load
 
 # Colors
 WHITE = (255, 255, 255)
@@ -82,99 +552,914 @@ QUIZ = 3
 DODGE = 4
 SLIDESHOW = 5
 NOTES = 6
+STATE_NAMES = {MENU: "menu", EXPLORATION: "exploration", INFO: "info", QUIZ: "quiz",
+               DODGE: "dodge", SLIDESHOW: "slideshow", NOTES: "notes"}
+
+# Exploration
+PLANET_INTERACT_MARGIN = 20  # extra reach beyond the planet and astronaut radii
+
+# World map, streamed in square chunks around the camera
+CHUNK_SIZE = 1024
+WORLD_CHUNKS = 8          # chunks on each side of the home chunk
+WORLD_RECT = pygame.Rect(-WORLD_CHUNKS * CHUNK_SIZE, -WORLD_CHUNKS * CHUNK_SIZE,
+                         (2 * WORLD_CHUNKS + 1) * CHUNK_SIZE, (2 * WORLD_CHUNKS + 1) * CHUNK_SIZE)
+CHUNK_KEEP_DISTANCE = 2   # chunks further than this from the view are evicted
+WORLD_SEED = 1969
+STAR_PARALLAX = 0.5       # the star layer scrolls slower than the planets
+BODY_CULL_MARGIN = 250    # planet labels reach this far beyond the planet center
+
+# Content packs (planets, facts and quiz banks)
+CONTENT_DIR = "content"
+CONTENT_CACHE_DIR = ".content_cache"
+CONTENT_CACHE_VERSION = 2  # bump when compile() changes, so older cached packs are rebuilt
+CONTENT_LANGUAGE = "ro"
+DEFAULT_LANGUAGE = "ro"  # used for anything missing in CONTENT_LANGUAGE
+PLANET_KINDS = ("quiz", "slideshow", "notes")
+
+# Quiz
+QUIZ_LENGTH = 5
+QUIZ_MAX_ANSWERS = 4           # answer buttons that fit under the question
+ANSWER_BUTTON_WIDTH = 600
+SMALL_FONT_SIZE = 60           # questions and answers are drawn in the small font
+HARDEST_QUESTIONS = 10         # questions listed in the content report's answer statistics
+HARDEST_MIN_ANSWERS = 5        # answers a question needs before it can be listed there
+REVIEW_INTERVALS = (1, 2, 4)   # quizzes until a missed question comes back, per review box
+
+# Custom events
+SLIDE_LOADED = pygame.USEREVENT + 1
+FONTS_LOADED = pygame.USEREVENT + 2
+
+# Slides
+SLIDE_BOX = (SCREEN_WIDTH - 200, SCREEN_HEIGHT - 200)
+SLIDE_CACHE_DIR = ".slide_cache"
+SLIDE_CACHE_HEADER = struct.Struct("<q4I")  # source mtime, box, scaled size; RGB pixels follow
+SLIDES_DIR = "pics"
+SLIDE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp')
+SLIDE_WINDOW = 2  # slides kept decoded on each side of the current one
+
+# Notes list
+NOTE_LINE_HEIGHT = 40
+NOTE_SPACING = 10
+SCROLL_WHEEL_SPEED = 900  # px/s added per wheel notch
+SCROLL_FRICTION = 4.0     # inertial scrolling decay per second
+
+# Student progress
+PROGRESS_FILE = "student_progress.db"
+DEFAULT_PROFILE = "default"  # uses the original student_notes.json
+PROFILES_DIR = "profiles"    # notes of the other profiles, one folder each
+PROFILE_NAME_LENGTH = 20
+PROGRESS_BATCH_DELAY = 0.5  # seconds the writer waits to group writes into one transaction
+PROGRESS_BATCH_SIZE = 256
+
+# Performance overlay and profiler
+HUD_KEY = pygame.K_F3
+HUD_HISTORY = 120  # frames shown in the frame-time graph
+HUD_RECT = pygame.Rect(10, SCREEN_HEIGHT - 290, 430, 280)
+PHASE_SMOOTHING = 0.1  # weight of the newest frame in the averaged phase times
+
+# Input recordings
+RECORDING_MAGIC = b"PLRC"
+RECORDING_VERSION = 3
+CHECKPOINT_INTERVAL = 600  # frames between state snapshots in a recording
+
+# Dodge game
+ASTEROID_COLOR = (139, 69, 19)
+ASTEROID_EDGE_COLOR = (101, 67, 33)
+STAR_SCROLL_SPEED = 60  # pixels per second
+MAX_DIRTY_RECTS = 500  # above this a full flip is cheaper than many small updates
+DODGE_STORM_ASTEROIDS = 5000  # asteroids in the largest --benchmark dodge round
+
+
+class StarField:
+    """Star background baked once into a surface instead of drawn every frame"""
+    def __init__(self, width=SCREEN_WIDTH, height=SCREEN_HEIGHT, count=100):
+        self.width = width
+        self.height = height
+        self.stars = []
+        for i in range(count):
+            x = (i * 137) % width
+            y = (i * 219) % height
+            size = (i % 3) + 1
+            self.stars.append((x, y, size))
+
+        self.surface = pygame.Surface((width, height))
+        self.surface.fill(SPACE_BLUE)
+        for x, y, size in self.stars:
+            # Also draw the wrapped copies so the surface tiles seamlessly
+            for dx in (-width, 0, width):
+                for dy in (-height, 0, height):
+                    pygame.draw.circle(self.surface, WHITE, (x + dx, y + dy), size)
+
+    def draw(self, screen, offset=0):
+        """Blit the star layer scrolled down by offset pixels (two blits)"""
+        offset %= self.height
+        screen.blit(self.surface, (0, offset))
+        if offset:
+            screen.blit(self.surface, (0, offset - self.height))
+
+    def draw_tiled(self, screen, offset_x, offset_y):
+        """Blit the star layer tiled across the screen, shifted by the given offset"""
+        offset_x %= self.width
+        offset_y %= self.height
+        for x in (offset_x - self.width, offset_x):
+            for y in (offset_y - self.height, offset_y):
+                screen.blit(self.surface, (x, y))
+
+    def star_rects(self, offset=0):
+        """Screen rects covered by the stars at the given scroll offset"""
+        rects = []
+        for x, y, size in self.stars:
+            y = (y + offset) % self.height
+            rect = pygame.Rect(x - size, y - size, size * 2 + 1, size * 2 + 1)
+            rects.append(rect)
+            if rect.bottom > self.height:
+                rects.append(rect.move(0, -self.height))
+        return rects
+
+
+class PlanetGrid:
+    """Uniform grid over planets for nearest-within-radius queries.
+
+    Planets are bucketed by the cell of their center; a query only looks at
+    the cells that the largest planet plus the query margin can reach.
+    """
+    def __init__(self, cell_size=128):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.max_radius = 0
+
+    def cell_of(self, planet):
+        return (int(planet.x // self.cell_size), int(planet.y // self.cell_size))
+
+    def add(self, planet):
+        self.cells.setdefault(self.cell_of(planet), []).append(planet)
+        self.max_radius = max(self.max_radius, planet.radius)
+
+    def remove(self, planet):
+        cell = self.cell_of(planet)
+        planets = self.cells.get(cell)
+        if planets and planet in planets:
+            planets.remove(planet)
+            if not planets:
+                del self.cells[cell]
+
+    def nearest(self, x, y, margin):
+        """Closest planet whose radius plus margin contains (x, y), or None"""
+        reach = self.max_radius + margin
+        min_cx = int((x - reach) // self.cell_size)
+        max_cx = int((x + reach) // self.cell_size)
+        min_cy = int((y - reach) // self.cell_size)
+        max_cy = int((y + reach) // self.cell_size)
+
+        best = None
+        best_dist = None
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                for planet in self.cells.get((cx, cy), ()):
+                    dx = planet.x - x
+                    dy = planet.y - y
+                    dist = dx * dx + dy * dy
+                    limit = planet.radius + margin
+                    if dist < limit * limit and (best is None or dist < best_dist):
+                        best = planet
+                        best_dist = dist
+        return best
+
+
+class StartupProfile:
+    """Wall-clock time of each startup phase, reported by --profile-startup"""
+    def __init__(self):
+        self.last = STARTED_AT
+        self.phases = {}
+        self.done = False
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+    def report(self):
+        return {
+            "phases_ms": {phase: round(seconds * 1000, 2) for phase, seconds in self.phases.items()},
+            "total_ms": round((self.last - STARTED_AT) * 1000, 2),
+        }
 
-class Game:
+
+STARTUP = StartupProfile()
+
+
+class FrameProfiler:
+    """Per-phase frame timings for the performance overlay and trace files.
+
+    The game loop calls mark() after each phase (events, update, draw,
+    present), guarded by `enabled`, so a disabled profiler costs one
+    attribute check per phase. When trace_events is a list, every phase is
+    also kept for a Chrome trace-event file.
+    """
     def __init__(self):
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.enabled = False
+        self.trace_events = None
+        self.origin = time.perf_counter()
+        self.frame_start = None
+        self.last_mark = 0.0
+        self.current = {}  # phase -> seconds in the frame being measured
+        self.phases = {}   # phase -> averaged seconds per frame
+        self.frame_times = deque(maxlen=HUD_HISTORY)
+
+    def start_frame(self):
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self.frame_times.append(now - self.frame_start)
+        for phase in set(self.phases) | set(self.current):
+            average = self.phases.get(phase, 0.0)
+            self.phases[phase] = average + (self.current.get(phase, 0.0) - average) * PHASE_SMOOTHING
+        self.current.clear()
+        self.frame_start = self.last_mark = now
+
+    def mark(self, phase):
+        """Record the time since the previous mark as phase"""
+        now = time.perf_counter()
+        self.add(phase, self.last_mark, now)
+        self.last_mark = now
+
+    def add(self, phase, start, end):
+        self.current[phase] = self.current.get(phase, 0.0) + end - start
+        if self.trace_events is not None:
+            self.trace_events.append((phase, start, end - start))
+
+    def start_trace(self):
+        self.trace_events = []
+        self.enabled = True
+
+    def save_trace(self, path):
+        """Write the recorded phases as Chrome trace-event JSON (chrome://tracing, Perfetto)"""
+        events = [{"name": phase, "ph": "X", "pid": 1, "tid": 1,
+                   "ts": round((start - self.origin) * 1e6, 1), "dur": round(duration * 1e6, 1)}
+                  for phase, start, duration in self.trace_events or ()]
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        except OSError as e:
+            print(f"Error saving trace: {e}")
+
+
+PROFILER = FrameProfiler()
+
+
+class PerformanceHud:
+    """Overlay with FPS, a frame-time graph, phase timings, cache hit rates and surface memory.
+
+    Its text is rendered outside the shared text cache, so changing numbers
+    neither evict game text nor skew the hit rate it reports.
+    """
+    def __init__(self, executor=None):
+        self.font = FontWrapper(20, executor)
+        self.visible = False
+        self.overlay = None
+
+    def lines(self, game):
+        frame_times = PROFILER.frame_times
+        average = sum(frame_times) / len(frame_times) if frame_times else 0.0
+        lines = [f"FPS {1 / average if average else 0:.0f}   {average * 1000:.1f} ms/frame"]
+
+        phases = sorted(PROFILER.phases.items(), key=lambda item: -item[1])
+        for phase, seconds in phases[:6]:
+            if seconds >= 0.00005:
+                lines.append(f"{phase}: {seconds * 1000:.2f} ms")
+
+        stats = FontWrapper.cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0.0
+        lines.append(f"text cache: {hit_rate:.0f}% hits, {stats['entries']} entries")
+        lines.append(f"surfaces: {game.surface_bytes() / 1048576:.1f} MB, "
+                     f"{sum(ALLOCATIONS.values())} allocated, {FontWrapper.pool.reuses} reused")
+        return lines
+
+    def draw(self, screen, game):
+        """Draw over the frame and return the area covered"""
+        rect = HUD_RECT
+        if self.overlay is None:
+            self.overlay = pygame.Surface(rect.size)
+            self.overlay.set_alpha(200)
+        screen.blit(self.overlay, rect)
+
+        # Frame-time graph: one bar per frame, the line is the 60 FPS budget
+        graph = pygame.Rect(rect.x + 10, rect.y + 10, rect.width - 20, 80)
+        scale = graph.height / (3 * SIM_DT)
+        for i, seconds in enumerate(PROFILER.frame_times):
+            height = min(graph.height, int(seconds * scale))
+            color = GREEN if seconds <= SIM_DT * 1.1 else YELLOW if seconds <= SIM_DT * 2.1 else RED
+            x = graph.x + i * graph.width // HUD_HISTORY
+            pygame.draw.line(screen, color, (x, graph.bottom), (x, graph.bottom - height))
+        budget_y = graph.bottom - int(SIM_DT * scale)
+        pygame.draw.line(screen, WHITE, (graph.x, budget_y), (graph.right, budget_y))
+
+        y = graph.bottom + 5
+        for line in self.lines(game):
+            text = self.font.render_uncached(line, WHITE)
+            screen.blit(text, (rect.x + 5, y))
+            FontWrapper.pool.release(text)
+            y += 19
+        return rect
+
+
+class HeldKeys(set):
+    """Keys that are down, tracked from KEYDOWN/KEYUP events.
+
+    Indexable like pygame.key.get_pressed(), so scripted and replayed
+    events move the astronaut exactly like a real keyboard.
+    """
+    def __getitem__(self, key):
+        return key in self
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            self.add(event.key)
+        elif event.type == pygame.KEYUP:
+            self.discard(event.key)
+        elif event.type == pygame.WINDOWFOCUSLOST:
+            self.clear()
+
+
+class Camera:
+    """View rectangle in world coordinates that follows a target.
+
+    The camera only moves when the target leaves the middle of the screen,
+    so a standing or slowly drifting astronaut keeps the background still.
+    """
+    def __init__(self, bounds, width=SCREEN_WIDTH, height=SCREEN_HEIGHT):
+        self.bounds = bounds
+        self.width = width
+        self.height = height
+        self.x = 0.0
+        self.y = 0.0
+        self.prev_x = 0.0
+        self.prev_y = 0.0
+
+    def follow(self, target_x, target_y):
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        left = self.x + self.width * 0.3
+        right = self.x + self.width * 0.7
+        top = self.y + self.height * 0.3
+        bottom = self.y + self.height * 0.7
+        if target_x < left:
+            self.x -= left - target_x
+        elif target_x > right:
+            self.x += target_x - right
+        if target_y < top:
+            self.y -= top - target_y
+        elif target_y > bottom:
+            self.y += target_y - bottom
+
+        self.x = max(self.bounds.left, min(self.bounds.right - self.width, self.x))
+        self.y = max(self.bounds.top, min(self.bounds.bottom - self.height, self.y))
+
+    def offset(self, alpha=1.0):
+        """World position of the screen's top-left corner, interpolated like the astronaut"""
+        return (int(self.prev_x + (self.x - self.prev_x) * alpha),
+                int(self.prev_y + (self.y - self.prev_y) * alpha))
+
+    def rect(self):
+        return pygame.Rect(int(self.x), int(self.y), self.width, self.height)
+
+
+class World:
+    """Bodies of the universe split into chunks that are streamed around the view.
+
+    Chunks near the camera are loaded (placed planets plus bodies generated
+    from the chunk coordinates) and chunks far from it are dropped, so memory
+    and drawing depend on what is on screen rather than on the world size.
+    """
+    def __init__(self, grid, seed=WORLD_SEED, bounds=WORLD_RECT):
+        self.grid = grid
+        self.seed = seed
+        self.bounds = bounds
+        self.placed = {}  # chunk -> bodies placed by the game
+        self.chunks = {}  # loaded chunk -> bodies
+
+    @staticmethod
+    def chunk_of(x, y):
+        return (int(x // CHUNK_SIZE), int(y // CHUNK_SIZE))
+
+    def chunks_in(self, rect):
+        """Chunk coordinates overlapping rect, limited to the world"""
+        rect = rect.clip(self.bounds)
+        if not rect.width or not rect.height:
+            return []
+        min_cx, min_cy = self.chunk_of(rect.left, rect.top)
+        max_cx, max_cy = self.chunk_of(rect.right - 1, rect.bottom - 1)
+        return [(cx, cy) for cx in range(min_cx, max_cx + 1) for cy in range(min_cy, max_cy + 1)]
+
+    def add_body(self, body):
+        key = self.chunk_of(body.x, body.y)
+        self.placed.setdefault(key, []).append(body)
+        if key in self.chunks:
+            self.chunks[key].append(body)
+            if body.interactive:
+                self.grid.add(body)
+
+    def generate(self, cx, cy):
+        """Decorative asteroids and moons, the same every time a chunk is loaded"""
+        if (cx, cy) == (0, 0):
+            return []
+        rng = random.Random(f"{self.seed}:{cx}:{cy}")
+        bodies = []
+        for _ in range(rng.randint(2, 6)):
+            x = cx * CHUNK_SIZE + rng.randint(50, CHUNK_SIZE - 50)
+            y = cy * CHUNK_SIZE + rng.randint(50, CHUNK_SIZE - 50)
+            shade = rng.randint(90, 170)
+            color = (shade, int(shade * rng.uniform(0.7, 1.0)), int(shade * rng.uniform(0.5, 0.9)))
+            bodies.append(Planet("", x, y, rng.randint(6, 24), color, interactive=False))
+        return bodies
+
+    def load(self, key):
+        bodies = list(self.placed.get(key, ())) + self.generate(*key)
+        self.chunks[key] = bodies
+        for body in bodies:
+            if body.interactive:
+                self.grid.add(body)
+
+    def unload(self, key):
+        for body in self.chunks.pop(key):
+            if body.interactive:
+                self.grid.remove(body)
+
+    def stream(self, view):
+        """Load the chunks around view and drop the ones that are far away"""
+        for key in self.chunks_in(view.inflate(CHUNK_SIZE * 2, CHUNK_SIZE * 2)):
+            if key not in self.chunks:
+                self.load(key)
+
+        keep_margin = CHUNK_SIZE * 2 * CHUNK_KEEP_DISTANCE
+        keep = set(self.chunks_in(view.inflate(keep_margin, keep_margin)))
+        for key in [key for key in self.chunks if key not in keep]:
+            self.unload(key)
+
+    def visible_bodies(self, view):
+        """Bodies whose disc or label may overlap view"""
+        area = view.inflate(BODY_CULL_MARGIN * 2, BODY_CULL_MARGIN * 2)
+        for key in self.chunks_in(area):
+            for body in self.chunks.get(key, ()):
+                if area.collidepoint(body.x, body.y):
+                    yield body
+
+
+@lru_cache(maxsize=1024)
+def scale_rect(rect, scale, offset):
+    """Window rect covering a canvas rect; dirty rects repeat, so the mapping is cached"""
+    x, y, w, h = rect
+    left = math.floor(x * scale) + offset[0]
+    top = math.floor(y * scale) + offset[1]
+    return pygame.Rect(left, top, math.ceil((x + w) * scale) + offset[0] - left,
+                       math.ceil((y + h) * scale) + offset[1] - top)
+
+
+class Display:
+    """The window and the SCREEN_WIDTH x SCREEN_HEIGHT canvas the game draws on.
+
+    At the canvas size the canvas is the window itself. Full screen on another
+    resolution uses SDL's GPU scaler, which stretches the whole frame in one
+    pass. Without a fast renderer, or for a window of another size, the canvas
+    is kept off-screen and only its dirty rects are scaled into the window.
+    Whole frames that change every frame (scrolling, asteroid storms) are
+    scaled with nearest-neighbour, several times cheaper than smoothing;
+    settle() smooths the last one once the screen stops moving.
+    """
+    def __init__(self, size=None, fullscreen=False):
+        canvas_size = (SCREEN_WIDTH, SCREEN_HEIGHT)
+        if fullscreen:
+            size = pygame.display.get_desktop_sizes()[0]
+        size = tuple(size or canvas_size)
+        flags = pygame.FULLSCREEN if fullscreen else 0
+        self.window = None
+        self.mode = "direct"
+        if size == canvas_size:
+            self.window = pygame.display.set_mode(canvas_size, flags)
+        elif fullscreen:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter("always")
+                window = pygame.display.set_mode(canvas_size, flags | pygame.SCALED)
+            # pygame falls back to a software renderer that scales the whole frame every flip
+            if not any("fast renderer" in str(warning.message) for warning in caught):
+                self.window = window
+                self.mode = "gpu"
+        if self.window is None:
+            self.window = pygame.display.set_mode(size, flags)
+            self.mode = "software"
+            self.canvas = pygame.Surface(canvas_size, 0, self.window)
+            self.scale = min(size[0] / canvas_size[0], size[1] / canvas_size[1])
+            view_size = (round(canvas_size[0] * self.scale), round(canvas_size[1] * self.scale))
+            self.offset = ((size[0] - view_size[0]) // 2, (size[1] - view_size[1]) // 2)
+            # Nearest-neighbour is exact for whole-number upscales, smoothing is for the rest
+            self.smooth = self.scale != int(self.scale)
+            self.window.fill(BLACK)
+        else:
+            self.canvas = self.window
+        self.rough = False  # the window shows a frame scaled without smoothing
+
+    def scale_area(self, rect, fast=False):
+        rect = pygame.Rect(rect).clip(self.canvas.get_rect())
+        target = scale_rect(tuple(rect), self.scale, self.offset).clip(self.window.get_rect())
+        if rect.w and rect.h:
+            destination = self.window.subsurface(target)
+            if self.smooth and not fast:
+                pygame.transform.smoothscale(self.canvas.subsurface(rect), target.size, destination)
+            else:
+                pygame.transform.scale(self.canvas.subsurface(rect), target.size, destination)
+        return target
+
+    def flip(self, fast=False):
+        """Show the whole canvas; fast is for frames that are replaced right away"""
+        if self.mode == "software":
+            self.scale_area(self.canvas.get_rect(), fast)
+            self.rough = fast and self.smooth
+        pygame.display.flip()
+
+    def settle(self):
+        """Smooth the last frame if it was scaled fast; call when the screen stops moving"""
+        if self.rough:
+            self.flip()
+
+    def update(self, rects):
+        if self.mode == "software":
+            rects = [self.scale_area(rect) for rect in rects]
+        pygame.display.update(rects)
+
+    def to_canvas(self, event):
+        """Event with its mouse position moved from window to canvas pixels"""
+        if self.mode != "software" or not hasattr(event, "pos"):
+            return event
+        x = (event.pos[0] - self.offset[0]) / self.scale
+        y = (event.pos[1] - self.offset[1]) / self.scale
+        return pygame.event.Event(event.type, dict(event.dict, pos=(int(x), int(y))))
+
+
+class Game:
+    def __init__(self, progress=None, display_size=None, fullscreen=False, notes_root=""):
+        STARTUP.mark("imports")
+        # Only the display is used (no sound, joysticks or pygame fonts), so only it is started
+        if not pygame.display.get_init():
+            pygame.display.init()
+        self.display = Display(display_size, fullscreen)
+        self.screen = self.display.canvas
         pygame.display.set_caption("Sa invatam planetele - Aventura educationala")
         self.clock = pygame.time.Clock()
         self.state = MENU
-        self.font_large = FontWrapper(120)
-        self.font_medium = FontWrapper(80)
-        self.font_small = FontWrapper(60)
+        STARTUP.mark("display")
+
+        # Fonts (and PIL) load on a background thread while the first frame is drawn
+        self.background_executor = ThreadPoolExecutor(max_workers=1)
+        self.font_large = FontWrapper(120, self.background_executor)
+        self.font_medium = FontWrapper(80, self.background_executor)
+        self.font_small = FontWrapper(SMALL_FONT_SIZE, self.background_executor)
+        self.font_small.pending.add_done_callback(self.post_fonts_loaded)
+        self.held_keys = HeldKeys()
+        self.hud = PerformanceHud(self.background_executor)
+        self.on_menu_ready = None  # called once the complete menu has been shown
+
+        # Cached background layers
+        self.starfield = StarField()
+        self.menu_background = None
+        self.exploration_background = None
+        self.exploration_background_key = None
+
+        # Fixed timestep: real time not yet simulated, and how far into the next step we render
+        self.accumulator = 0.0
+        self.alpha = 1.0
+
+        # Dirty rectangle tracking (None means the whole screen must be updated)
+        self.presented_state = None
+        self.full_redraw = True
+        self.last_astronaut_rect = None
+        self.last_hint_planet = None
+        self.last_hint_rect = None
 
         # Game objects
-        self.astronaut = Astronaut(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        self.planets = self.create_planets()
+        self.planets = []
+        self.planet_grid = PlanetGrid()
+        self.world = World(self.planet_grid)
+        self.content = ContentPack()
+        for planet in self.create_planets():
+            self.add_planet(planet)
         self.current_planet = None
         self.quiz = None
         self.dodge_game = None
-        self.visited_planets = set()
+        self.progress = progress or ProgressStore(PROGRESS_FILE)
+        self.profile_picker = ProfilePicker(self.progress.profile_names)
         self.slideshow = None
+        self.slide_loader = SlideLoader()
         self.notes = None
 
-    def create_planets(self):
-        """Create planets at different positions"""
-        planets = [
-            Planet("Mercur", 200, 200, 30, (169, 169, 169)),
-            Planet("Venus", 700, 150, 45, (255, 198, 73)),
-            Planet("Pamant", 300, 500, 50, (100, 149, 237)),
-            Planet("Marte", 800, 450, 40, (188, 39, 50)),
-            Planet("Jupiter", 500, 600, 80, (201, 138, 87)),
-            Planet("Saturn", 150, 400, 70, (238, 217, 130)),
-            Planet("Uranus", 650, 600, 55, (79, 208, 231)),
-            Planet("Neptun", 900, 250, 55, (62, 84, 232)),
-            Planet("Hai sa invatam", 500, 300, 60, PINK, is_slideshow=True, has_smiley=True),
-            Planet("Notite", 400, 100, 55, (135, 206, 250), is_notes=True, has_smiley=True),  # Light blue
-        ]
-        return planets
+        self.recorder = None  # InputRecorder saving this session, if any
+
+        # Per-profile state, created when a profile is first used
+        self.notes_root = notes_root  # folder the notes files are relative to
+        self.profile_decks = {}
+        self.note_stores = {}
+        self.switch_profile(DEFAULT_PROFILE)
+        STARTUP.mark("game_objects")
+
+        # Work done while the menu waits for input, so screens open without loading
+        self.warm_up_tasks = deque([
+            self.warm_up_slides,
+            lambda: self.note_store.load(),
+            lambda: self.note_store.search_index(),
+            self.warm_up_labels,
+            load_numpy,
+        ])
+
+    @staticmethod
+    def post_fonts_loaded(future):
+        # The fonts are loaded in submission order, so the last one means all are ready
+        if pygame.display.get_init():
+            pygame.event.post(pygame.event.Event(FONTS_LOADED))
+
+    def fonts_ready(self):
+        return self.font_large.ready() and self.font_medium.ready() and self.font_small.ready()
+
+    def warm_up_slides(self):
+        for path in discover_slides()[:SLIDE_WINDOW + 1]:
+            self.slide_loader.request(path)
+
+    def warm_up_labels(self):
+        for planet in self.planets:
+            self.font_small.render(planet.name, True, WHITE)
+
+    def switch_profile(self, profile):
+        """Make profile the active student, keeping fonts, slides and content loaded"""
+        self.profile = profile
+        self.profile_picker.current = profile
+        self.question_decks = self.profile_decks.setdefault(profile, {})
+        if profile not in self.note_stores:
+            self.note_stores[profile] = NoteStore(os.path.join(self.notes_root, profile_notes_file(profile)))
+        self.note_store = self.note_stores[profile]
+        self.visited_planets = set()  # loaded from the progress store when exploration starts
+
+        # Every student starts at home
+        self.astronaut = Astronaut(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2, WORLD_RECT)
+        self.camera = Camera(WORLD_RECT)
+        self.world.stream(self.camera.rect())
+        self.last_astronaut_rect = None
+        self.last_hint_planet = None
+        self.exploration_background_key = None
 
-    def run(self):
+    def create_planets(self):
+        """Create planets from the content pack"""
+        return self.content.create_planets()
+
+    def add_planet(self, planet):
+        self.planets.append(planet)
+        self.world.add_body(planet)
+
+    def question_deck(self, planet):
+        """Deck of the planet's questions, continued from the profile's last session"""
+        deck = self.question_decks.get(planet.planet_id)
+        if deck is None:
+            deck = QuestionDeck(planet.questions)
+            state = self.progress.deck_state(self.profile, planet.planet_id)
+            if state is not None:
+                deck.restore(state)
+            self.question_decks[planet.planet_id] = deck
+        return deck
+
+    def save_deck(self, planet):
+        self.progress.save_deck(self.profile, planet.planet_id, self.question_deck(planet).snapshot())
+
+    def quiz_planet_count(self):
+        return sum(1 for planet in self.planets if planet.questions)
+
+    def nearby_planet(self):
+        """Planet the astronaut is close enough to interact with"""
+        return self.planet_grid.nearest(self.astronaut.x, self.astronaut.y,
+                                        self.astronaut.size + PLANET_INTERACT_MARGIN)
+
+    def run(self, trace_file=None):
+        profiler = PROFILER
         running = True
         while running:
-            self.clock.tick(FPS)
-
-            for event in pygame.event.get():
+            animating = self.is_animating()
+            if animating:
+                tick = self.clock.tick(FPS)
+                events = pygame.event.get()
+            else:
+                self.display.settle()
+                if self.state == MENU and self.warm_up_tasks and not self.full_redraw:
+                    if self.fonts_ready():
+                        # Idle work can run: check for input without sleeping
+                        event = pygame.event.poll()
+                    else:
+                        # Warm-up waits for the fonts, so sleep a little between checks
+                        event = pygame.event.wait(FONT_WAIT_TIMEOUT)
+                else:
+                    # Static screen: sleep until the user does something
+                    event = pygame.event.wait(IDLE_TIMEOUT)
+                events = [] if event.type == pygame.NOEVENT else [event] + pygame.event.get()
+                self.clock.tick()
+                tick = 0
+            if profiler.enabled:
+                profiler.start_frame()
+            if self.recorder:
+                self.recorder.frame(tick, animating)
+
+            redraw = self.full_redraw
+            for event in events:
+                event = self.display.to_canvas(event)
+                if self.recorder:
+                    self.recorder.event(event)
                 if event.type == pygame.QUIT:
                     running = False
+                elif event.type in (pygame.VIDEOEXPOSE, FONTS_LOADED):
+                    self.full_redraw = True
+                # No screen reacts to hovering, only to clicks and keys
+                if event.type != pygame.MOUSEMOTION:
+                    redraw = True
 
                 self.handle_events(event)
-
-            self.update()
-            self.draw()
-            pygame.display.flip()
-
+            if profiler.enabled:
+                profiler.mark("events")
+
+            self.advance(tick, animating)
+            if profiler.enabled:
+                profiler.mark("update_" + STATE_NAMES[self.state])
+
+            if redraw or animating:
+                dirty_rects = self.draw()
+                if profiler.enabled:
+                    profiler.mark("draw_" + STATE_NAMES[self.state])
+                self.present(dirty_rects)
+                if profiler.enabled:
+                    profiler.mark("present")
+            elif self.state == MENU and self.warm_up_tasks and self.fonts_ready():
+                self.warm_up_tasks.popleft()()
+            if self.recorder:
+                self.recorder.end_frame(self)
+
+        if trace_file:
+            PROFILER.save_trace(trace_file)
+        if self.recorder:
+            self.recorder.close()
+        self.progress.close()
         pygame.quit()
         sys.exit()
 
+    def advance(self, tick, animating):
+        """Simulate a frame that took tick milliseconds"""
+        if animating:
+            # Simulate in fixed steps of real time; a slow frame runs several
+            # steps before the next draw instead of slowing the game down
+            self.accumulator += min(tick / 1000, MAX_FRAME_TIME)
+            while self.accumulator >= SIM_DT:
+                self.update(SIM_DT)
+                self.accumulator -= SIM_DT
+            self.alpha = self.accumulator / SIM_DT
+        else:
+            self.accumulator = 0.0
+            self.alpha = 1.0
+
+    def snapshot(self):
+        """Game state as plain values (marshal-able), enough to continue a replay from here"""
+        astronaut, camera = self.astronaut, self.camera
+        return {
+            "state": self.state,
+            "profile": self.profile,
+            "random": random.getstate(),
+            "accumulator": self.accumulator,
+            "held_keys": sorted(self.held_keys),
+            "astronaut": (astronaut.x, astronaut.y, astronaut.prev_x, astronaut.prev_y),
+            "camera": (camera.x, camera.y, camera.prev_x, camera.prev_y),
+            "visited": sorted(self.visited_planets),
+            "planet": self.current_planet.planet_id if self.current_planet else None,
+            "decks": {name: deck.snapshot() for name, deck in self.question_decks.items()},
+            "quiz": self.quiz.snapshot() if self.quiz else None,
+            "dodge": self.dodge_game.snapshot() if self.dodge_game else None,
+            "slide": self.slideshow.current_slide if self.slideshow else None,
+            "notes_scroll": self.notes.scroll_y if self.notes else None,
+        }
+
+    def restore(self, data):
+        """Continue from a snapshot() taken by this or another run of the game"""
+        if data["profile"] != self.profile:
+            self.switch_profile(data["profile"])
+        random.setstate(data["random"])
+        self.state = data["state"]
+        self.accumulator = data["accumulator"]
+        self.held_keys.clear()
+        self.held_keys.update(data["held_keys"])
+        astronaut, camera = self.astronaut, self.camera
+        astronaut.x, astronaut.y, astronaut.prev_x, astronaut.prev_y = data["astronaut"]
+        camera.x, camera.y, camera.prev_x, camera.prev_y = data["camera"]
+        self.world.stream(camera.rect())
+        self.visited_planets = set(data["visited"])
+
+        planets = {planet.planet_id: planet for planet in self.planets if planet.planet_id}
+        for planet_id, deck in data["decks"].items():
+            if planet_id in planets:
+                self.question_deck(planets[planet_id]).restore(deck)
+        self.current_planet = planets.get(data["planet"])
+        self.quiz = None
+        if data["quiz"] is not None:
+            self.quiz = Quiz.from_snapshot(self.question_deck(self.current_planet), data["quiz"])
+        self.dodge_game = None
+        if data["dodge"] is not None:
+            self.dodge_game = DodgeGame.from_snapshot(self.starfield, data["dodge"])
+        self.slideshow = None
+        if data["slide"] is not None:
+            self.slideshow = Slideshow(self.slide_loader)
+            self.slideshow.show_slide(data["slide"])
+        self.notes = None
+        if data["notes_scroll"] is not None:
+            self.notes = Notes(self.note_store)
+            self.notes.scroll_y = data["notes_scroll"]
+
+        self.last_astronaut_rect = None
+        self.last_hint_planet = None
+        self.exploration_background_key = None
+        self.full_redraw = True
+
+    def is_animating(self):
+        """True when the current screen changes without user input"""
+        if self.hud.visible:
+            return True
+        if self.state == DODGE:
+            return self.dodge_game is not None and not self.dodge_game.finished
+        if self.state == NOTES:
+            return self.notes is not None and self.notes.is_scrolling()
+        if self.state == EXPLORATION:
+            keys = self.held_keys
+            return (keys[pygame.K_LEFT] or keys[pygame.K_RIGHT] or
+                    keys[pygame.K_UP] or keys[pygame.K_DOWN])
+        return False
+
     def handle_events(self, event):
+        self.held_keys.handle_event(event)
+        if event.type == pygame.KEYDOWN and event.key == HUD_KEY:
+            self.toggle_hud()
+            return
+
         if self.state == MENU:
             if event.type == pygame.MOUSEBUTTONDOWN:
-                mouse_pos = pygame.mouse.get_pos()
+                mouse_pos = event.pos
                 # Check if start button clicked
                 button_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 50, 200, 60)
                 if button_rect.collidepoint(mouse_pos):
                     self.state = EXPLORATION
+                    self.visited_planets = self.progress.visited_planets(self.profile)
+                    return
+
+            profile = self.profile_picker.handle_event(event)
+            if profile is not None and profile != self.profile:
+                if profile not in self.profile_picker.names:
+                    self.progress.add_profile(profile)
+                    self.profile_picker.add(profile)
+                self.switch_profile(profile)
 
         elif self.state == EXPLORATION:
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE:
+                if event.key == pygame.K_ESCAPE:
+                    # Back to the menu to switch students; fonts, content and decks stay loaded
+                    self.state = MENU
+                elif event.key == pygame.K_SPACE:
                     # Check if near a planet
-                    for planet in self.planets:
-                        if planet.check_collision(self.astronaut):
-                            self.current_planet = planet
-                            if planet.is_slideshow:
-                                self.state = SLIDESHOW
-                                self.slideshow = Slideshow()
-                            elif planet.is_notes:
-                                self.state = NOTES
-                                self.notes = Notes()
-                            else:
-                                self.state = INFO
-                            break
+                    planet = self.nearby_planet()
+                    if planet:
+                        self.current_planet = planet
+                        if planet.is_slideshow:
+                            self.state = SLIDESHOW
+                            self.slideshow = Slideshow(self.slide_loader)
+                        elif planet.is_notes:
+                            self.state = NOTES
+                            self.notes = Notes(self.note_store)
+                        else:
+                            self.state = INFO
 
         elif self.state == INFO:
             if event.type == pygame.KEYDOWN or event.type == pygame.MOUSEBUTTONDOWN:
-                self.state = QUIZ
-                self.quiz = Quiz(self.current_planet.name)
+                self.quiz = Quiz(self.question_deck(self.current_planet))
+                if self.quiz.finished:
+                    # No questions to ask: back to exploring instead of an empty quiz
+                    self.state = EXPLORATION
+                    self.quiz = None
+                    self.current_planet = None
+                else:
+                    self.state = QUIZ
+                    self.save_deck(self.current_planet)
 
         elif self.state == QUIZ:
             if self.quiz:
                 self.quiz.handle_event(event)
+                if self.quiz.answers:
+                    while self.quiz.answers:
+                        question, correct = self.quiz.answers.pop(0)
+                        self.progress.record_answer(self.profile, self.current_planet.planet_id, question, correct)
+                    # The review boxes changed
+                    self.save_deck(self.current_planet)
                 if self.quiz.finished:
-                    if self.quiz.score == 5:
+                    if self.quiz.is_perfect():
                         self.state = DODGE
-                        self.dodge_game = DodgeGame()
+                        # Its own generator, seeded from the game's, so replays spawn the same asteroids
+                        self.dodge_game = DodgeGame(self.starfield, rng=random.Random(random.getrandbits(64)))
                     else:
                         self.state = EXPLORATION
                         self.quiz = None
@@ -183,7 +1468,10 @@ class Game:
             if self.dodge_game:
                 self.dodge_game.handle_event(event)
                 if self.dodge_game.finished:
-                    self.visited_planets.add(self.current_planet.name)
+                    self.visited_planets.add(self.current_planet.planet_id)
+                    self.progress.record_dodge(self.profile, self.current_planet.planet_id,
+                                               self.dodge_game.time_survived, self.dodge_game.won)
+                    self.progress.record_visit(self.profile, self.current_planet.planet_id)
                     self.state = EXPLORATION
                     self.dodge_game = None
                     self.current_planet = None
@@ -204,88 +1492,182 @@ class Game:
                     self.notes = None
                     self.current_planet = None
 
-    def update(self):
+    def update(self, dt):
+        """Advance the simulation by dt seconds"""
         if self.state == EXPLORATION:
-            keys = pygame.key.get_pressed()
-            self.astronaut.update(keys)
+            self.astronaut.update(self.held_keys, dt)
+            self.camera.follow(self.astronaut.x, self.astronaut.y)
+            self.world.stream(self.camera.rect())
 
         elif self.state == DODGE:
             if self.dodge_game:
-                self.dodge_game.update()
+                self.dodge_game.update(dt, self.held_keys)
 
-    def draw(self):
-        self.screen.fill(SPACE_BLUE)
+        elif self.state == NOTES:
+            if self.notes:
+                self.notes.update(dt)
+
+    def toggle_hud(self):
+        self.hud.visible = not self.hud.visible
+        # The profiler keeps running while a trace is being recorded
+        PROFILER.enabled = self.hud.visible or PROFILER.trace_events is not None
+        self.full_redraw = True
+
+    def surface_bytes(self):
+        """Approximate memory held in pygame surfaces"""
+        surfaces = [self.screen, self.starfield.surface, self.menu_background, self.exploration_background]
+        surfaces.extend(self.slide_loader.surfaces.values())
+        for font in (self.font_large, self.font_medium, self.font_small, self.hud.font):
+            if font.atlas:
+                surfaces.append(font.atlas.surface)
+        total = sum(TextSurfaceCache.surface_bytes(surface) for surface in surfaces if surface is not None)
+        return total + FontWrapper.cache.stats()["bytes"]
+
+    def present(self, dirty_rects):
+        """Push the frame to the display, updating only dirty rects when possible"""
+        if self.hud.visible:
+            hud_rect = self.hud.draw(self.screen, self)
+            if dirty_rects is not None:
+                dirty_rects = list(dirty_rects) + [hud_rect]
+        # Dirty rects cannot fix a frame scaled fast, so that one is replaced whole
+        if (dirty_rects is None or self.full_redraw or self.presented_state != self.state
+                or self.display.rough):
+            self.display.flip(fast=self.is_animating())
+        elif dirty_rects:
+            self.display.update(dirty_rects)
+        self.presented_state = self.state
+        self.full_redraw = False
+        FontWrapper.cache.recycle()
+
+        if not STARTUP.done:
+            if "first_frame" not in STARTUP.phases:
+                STARTUP.mark("first_frame")
+            elif self.state != MENU or self.menu_background is not None:
+                STARTUP.mark("fonts_and_menu")
+                STARTUP.done = True
+                if self.on_menu_ready:
+                    self.on_menu_ready()
 
+    def draw(self):
+        """Draw the current state; returns the changed rects, or None for the whole screen"""
+        # These states repaint the whole screen from cached layers
         if self.state == MENU:
-            self.draw_menu()
+            return self.draw_menu()
         elif self.state == EXPLORATION:
-            self.draw_exploration()
-        elif self.state == INFO:
+            return self.draw_exploration()
+        elif self.state == DODGE:
+            return self.draw_dodge()
+
+        self.screen.fill(SPACE_BLUE)
+
+        if self.state == INFO:
             self.draw_info()
         elif self.state == QUIZ:
             self.draw_quiz()
-        elif self.state == DODGE:
-            self.draw_dodge()
         elif self.state == SLIDESHOW:
             self.draw_slideshow()
         elif self.state == NOTES:
             self.draw_notes()
+        return None
 
-    def draw_menu(self):
-        # Draw stars background
-        for i in range(100):
-            x = (i * 137) % SCREEN_WIDTH
-            y = (i * 219) % SCREEN_HEIGHT
-            size = (i % 3) + 1
-            pygame.draw.circle(self.screen, WHITE, (x, y), size)
+    def build_menu_background(self):
+        background = self.starfield.surface.copy()
 
         # Title
         title = self.font_large.render("SA INVATAM PLANETELE", True, YELLOW)
         title_rect = title.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 - 20))
-        self.screen.blit(title, title_rect)
+        background.blit(title, title_rect)
 
         # Subtitle
         subtitle = self.font_small.render("(cu ajutorul manualului ArtKlett)", True, WHITE)
         subtitle_rect = subtitle.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + 40))
-        self.screen.blit(subtitle, subtitle_rect)
+        background.blit(subtitle, subtitle_rect)
 
         # Astronaut representation
-        pygame.draw.circle(self.screen, WHITE, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50), 30)
-        pygame.draw.circle(self.screen, SPACE_BLUE, (SCREEN_WIDTH // 2 - 10, SCREEN_HEIGHT // 2 - 60), 5)
-        pygame.draw.circle(self.screen, SPACE_BLUE, (SCREEN_WIDTH // 2 + 10, SCREEN_HEIGHT // 2 - 60), 5)
+        pygame.draw.circle(background, WHITE, (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 - 50), 30)
+        pygame.draw.circle(background, SPACE_BLUE, (SCREEN_WIDTH // 2 - 10, SCREEN_HEIGHT // 2 - 60), 5)
+        pygame.draw.circle(background, SPACE_BLUE, (SCREEN_WIDTH // 2 + 10, SCREEN_HEIGHT // 2 - 60), 5)
 
         # Start button
         button_rect = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2 + 50, 200, 60)
-        pygame.draw.rect(self.screen, GREEN, button_rect, border_radius=10)
+        pygame.draw.rect(background, GREEN, button_rect, border_radius=10)
         start_text = self.font_medium.render("INCEPE", True, BLACK)
         start_rect = start_text.get_rect(center=button_rect.center)
-        self.screen.blit(start_text, start_rect)
+        background.blit(start_text, start_rect)
 
-    def draw_exploration(self):
-        # Draw stars
-        for i in range(100):
-            x = (i * 137) % SCREEN_WIDTH
-            y = (i * 219) % SCREEN_HEIGHT
-            size = (i % 3) + 1
-            pygame.draw.circle(self.screen, WHITE, (x, y), size)
+        return background
 
-        # Draw planets
-        for planet in self.planets:
-            planet.draw(self.screen, self.font_small)
-            if planet.name in self.visited_planets:
+    def draw_menu(self):
+        if self.menu_background is None and not self.fonts_ready():
+            # First frames: stars only, the text follows when FONTS_LOADED arrives
+            self.screen.blit(self.starfield.surface, (0, 0))
+            return None
+
+        # Only the profile picker changes, the rest of the menu is drawn once
+        if self.menu_background is None:
+            self.menu_background = self.build_menu_background()
+        self.screen.blit(self.menu_background, (0, 0))
+        return [self.profile_picker.draw(self.screen, self.font_medium, self.font_small)]
+
+    def build_exploration_background(self, offset):
+        if self.exploration_background is None:
+            self.exploration_background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background = self.exploration_background
+        offset_x, offset_y = offset
+        self.starfield.draw_tiled(background, -int(offset_x * STAR_PARALLAX), -int(offset_y * STAR_PARALLAX))
+
+        # Draw planets (only the ones in view)
+        view = pygame.Rect(offset_x, offset_y, SCREEN_WIDTH, SCREEN_HEIGHT)
+        for planet in self.world.visible_bodies(view):
+            planet.draw(background, self.font_small, offset)
+            if planet.planet_id in self.visited_planets:
                 # Draw checkmark
-                pygame.draw.circle(self.screen, GREEN, (planet.x + planet.radius, planet.y - planet.radius), 10)
-
-        # Draw astronaut
-        self.astronaut.draw(self.screen)
+                pygame.draw.circle(background, GREEN, (planet.x + planet.radius - offset_x,
+                                                       planet.y - planet.radius - offset_y), 10)
 
         # Instructions
-        inst_text = self.font_small.render("Foloseste sagetile pentru a te misca | SPACE pentru interactiune", True, WHITE)
-        self.screen.blit(inst_text, (20, 20))
+        inst_text = self.font_small.render("Sageti: misca | SPACE: interactiune | ESC: meniu", True, WHITE)
+        background.blit(inst_text, (20, 20))
 
         # Progress
-        progress_text = self.font_small.render(f"Planete exploratе: {len(self.visited_planets)}/8", True, YELLOW)
-        self.screen.blit(progress_text, (20, 60))
+        progress_text = self.font_small.render(f"Planete exploratе: {len(self.visited_planets)}/{self.quiz_planet_count()}", True, YELLOW)
+        background.blit(progress_text, (20, 60))
+
+        return background
+
+    def draw_exploration(self):
+        # The background only changes when the camera moves or a planet is completed
+        offset = self.camera.offset(self.alpha)
+        key = (offset, len(self.planets), frozenset(self.visited_planets))
+        if self.exploration_background_key != key:
+            self.build_exploration_background(offset)
+            self.exploration_background_key = key
+            self.full_redraw = True
+        self.screen.blit(self.exploration_background, (0, 0))
+
+        # Draw astronaut
+        self.astronaut.draw(self.screen, self.alpha, offset)
+
+        astronaut_rect = self.astronaut.get_rect(self.alpha, offset)
+        dirty = []
+        if astronaut_rect != self.last_astronaut_rect:
+            dirty.append(astronaut_rect)
+            if self.last_astronaut_rect:
+                dirty.append(self.last_astronaut_rect)
+        self.last_astronaut_rect = astronaut_rect
+
+        # Interaction hint for the planet in reach
+        planet = self.nearby_planet()
+        hint_rect = None
+        if planet:
+            hint = self.font_small.render(f"Apasa SPACE: {planet.name}", True, GREEN)
+            hint_rect = hint.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT - 40))
+            self.screen.blit(hint, hint_rect)
+        if planet is not self.last_hint_planet:
+            dirty.extend(rect for rect in (hint_rect, self.last_hint_rect) if rect)
+            self.last_hint_planet = planet
+            self.last_hint_rect = hint_rect
+        return dirty
 
     def draw_info(self):
         self.screen.fill(SPACE_BLUE)
@@ -302,7 +1684,7 @@ class Game:
                              self.current_planet.radius * 2)
 
             # Info text
-            info = self.current_planet.get_info()
+            info = self.current_planet.facts or ["Informatii indisponibile"]
             y_offset = SCREEN_HEIGHT // 2 + 100
             for line in info:
                 text = self.font_small.render(line, True, WHITE)
@@ -321,7 +1703,8 @@ class Game:
 
     def draw_dodge(self):
         if self.dodge_game:
-            self.dodge_game.draw(self.screen, self.font_medium, self.font_small)
+            return self.dodge_game.draw(self.screen, self.font_medium, self.font_small, self.alpha)
+        return None
 
     def draw_slideshow(self):
         if self.slideshow:
@@ -332,42 +1715,185 @@ class Game:
             self.notes.draw(self.screen, self.font_medium, self.font_small)
 
 
+def profile_notes_file(profile):
+    """Notes file of a profile; names are folded to a safe folder name plus a hash"""
+    if profile == DEFAULT_PROFILE:
+        return "student_notes.json"
+    slug = re.sub(r"[^a-z0-9]+", "_", fold_text(profile)).strip("_")
+    digest = hashlib.sha1(profile.encode("utf-8")).hexdigest()[:8]
+    return os.path.join(PROFILES_DIR, f"{slug}-{digest}", "student_notes.json")
+
+
+class ProfilePicker:
+    """Student chooser under the start button: arrows cycle the profiles, + adds one.
+
+    The profile list is read from the progress store on first use only. A
+    new name is refused, with a message in the name box, when it folds to
+    the guest profile or to a student who already exists.
+    """
+    def __init__(self, load_names):
+        self.load_names = load_names
+        self.loaded_names = None
+        self.current = DEFAULT_PROFILE
+        self.typing = False
+        self.text = ""
+        self.message = None  # why the typed name was refused, shown until the next key
+        self.prev_rect = pygame.Rect(SCREEN_WIDTH // 2 - 260, SCREEN_HEIGHT // 2 + 140, 60, 60)
+        self.name_rect = pygame.Rect(SCREEN_WIDTH // 2 - 190, SCREEN_HEIGHT // 2 + 140, 380, 60)
+        self.next_rect = pygame.Rect(SCREEN_WIDTH // 2 + 200, SCREEN_HEIGHT // 2 + 140, 60, 60)
+        self.new_rect = pygame.Rect(SCREEN_WIDTH // 2 - 130, SCREEN_HEIGHT // 2 + 215, 260, 50)
+        self.area = self.prev_rect.union(self.next_rect).union(self.new_rect)
+
+    @property
+    def names(self):
+        if self.loaded_names is None:
+            self.loaded_names = [DEFAULT_PROFILE] + [name for name in self.load_names() if name != DEFAULT_PROFILE]
+        return self.loaded_names
+
+    def add(self, profile):
+        self.names.append(profile)
+
+    @staticmethod
+    def label(profile):
+        return "Invitat" if profile == DEFAULT_PROFILE else profile
+
+    @staticmethod
+    def name_key(name):
+        return " ".join(fold_text(name).split())
+
+    def refusal(self, name):
+        """Why name cannot be a new profile, or None"""
+        key = self.name_key(name)
+        if key in (self.name_key(DEFAULT_PROFILE), self.name_key(self.label(DEFAULT_PROFILE))):
+            return "Nume rezervat"
+        for profile in self.names:
+            if profile != DEFAULT_PROFILE and self.name_key(profile) == key:
+                return f"Exista deja: {profile}"
+        return None
+
+    def cycle(self, step):
+        names = self.names
+        index = names.index(self.current) if self.current in names else 0
+        return names[(index + step) % len(names)]
+
+    def handle_event(self, event):
+        """Return the profile to switch to, or None"""
+        if self.typing:
+            if event.type != pygame.KEYDOWN:
+                return None
+            self.message = None
+            if event.key == pygame.K_RETURN:
+                name = self.text.strip()
+                if name:
+                    self.message = self.refusal(name)
+                    if self.message:
+                        return None
+                self.typing = False
+                return name or None
+            if event.key == pygame.K_ESCAPE:
+                self.typing = False
+            elif event.key == pygame.K_BACKSPACE:
+                self.text = self.text[:-1]
+            elif event.unicode and event.unicode.isprintable() and len(self.text) < PROFILE_NAME_LENGTH:
+                self.text += event.unicode
+            return None
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            mouse_pos = event.pos
+            if self.prev_rect.collidepoint(mouse_pos):
+                return self.cycle(-1)
+            if self.next_rect.collidepoint(mouse_pos):
+                return self.cycle(1)
+            if self.new_rect.collidepoint(mouse_pos):
+                self.typing = True
+                self.text = ""
+                self.message = None
+        return None
+
+    def draw(self, screen, font_medium, font_small):
+        """Draw over the menu background and return the area drawn"""
+        for rect, symbol in ((self.prev_rect, "<"), (self.next_rect, ">")):
+            pygame.draw.rect(screen, (50, 50, 150), rect, border_radius=10)
+            arrow = font_medium.render(symbol, True, WHITE)
+            screen.blit(arrow, arrow.get_rect(center=rect.center))
+
+        pygame.draw.rect(screen, BLACK, self.name_rect, border_radius=10)
+        pygame.draw.rect(screen, YELLOW if self.typing else WHITE, self.name_rect, 2, border_radius=10)
+        if self.message:
+            name = font_small.render(self.message, True, RED)
+        else:
+            text = self.text + "_" if self.typing else self.label(self.current)
+            name = font_small.render(text, True, WHITE, volatile=self.typing)
+        # Long names are cut at the box so they stay inside the returned area
+        clip = screen.get_clip()
+        screen.set_clip(self.name_rect.inflate(-8, 0))
+        screen.blit(name, name.get_rect(center=self.name_rect.center))
+        screen.set_clip(clip)
+
+        pygame.draw.rect(screen, (100, 100, 100), self.new_rect, border_radius=10)
+        new = font_small.render("+ Elev nou", True, WHITE)
+        screen.blit(new, new.get_rect(center=self.new_rect.center))
+        return self.area
+
+
 class Astronaut:
-    def __init__(self, x, y):
+    def __init__(self, x, y, bounds=None):
         self.x = x
         self.y = y
+        self.bounds = bounds or pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.prev_x = x
+        self.prev_y = y
         self.size = 20
-        self.speed = 5
+        self.speed = 300  # pixels per second
 
-    def update(self, keys):
+    def update(self, keys, dt):
+        self.prev_x = self.x
+        self.prev_y = self.y
+        step = self.speed * dt
         if keys[pygame.K_LEFT]:
-            self.x -= self.speed
+            self.x -= step
         if keys[pygame.K_RIGHT]:
-            self.x += self.speed
+            self.x += step
         if keys[pygame.K_UP]:
-            self.y -= self.speed
+            self.y -= step
         if keys[pygame.K_DOWN]:
-            self.y += self.speed
-
-        # Keep on screen
-        self.x = max(self.size, min(SCREEN_WIDTH - self.size, self.x))
-        self.y = max(self.size, min(SCREEN_HEIGHT - self.size, self.y))
-
-    def draw(self, screen):
+            self.y += step
+
+        # Keep inside the world
+        self.x = max(self.bounds.left + self.size, min(self.bounds.right - self.size, self.x))
+        self.y = max(self.bounds.top + self.size, min(self.bounds.bottom - self.size, self.y))
+
+    def render_pos(self, alpha=1.0):
+        """Position interpolated between the last two simulation steps"""
+        return (int(self.prev_x + (self.x - self.prev_x) * alpha),
+                int(self.prev_y + (self.y - self.prev_y) * alpha))
+
+    def get_rect(self, alpha=1.0, offset=(0, 0)):
+        """Screen area covered by the astronaut"""
+        x, y = self.render_pos(alpha)
+        return pygame.Rect(x - offset[0] - self.size, y - offset[1] - self.size,
+                           self.size * 2 + 1, self.size * 2 + 1)
+
+    def draw(self, screen, alpha=1.0, offset=(0, 0)):
+        x, y = self.render_pos(alpha)
+        x -= offset[0]
+        y -= offset[1]
         # Body
-        pygame.draw.circle(screen, WHITE, (int(self.x), int(self.y)), self.size)
+        pygame.draw.circle(screen, WHITE, (x, y), self.size)
         # Helmet details
-        pygame.draw.circle(screen, SPACE_BLUE, (int(self.x - 7), int(self.y - 5)), 3)
-        pygame.draw.circle(screen, SPACE_BLUE, (int(self.x + 7), int(self.y - 5)), 3)
+        pygame.draw.circle(screen, SPACE_BLUE, (x - 7, y - 5), 3)
+        pygame.draw.circle(screen, SPACE_BLUE, (x + 7, y - 5), 3)
         # Smile
         pygame.draw.arc(screen, SPACE_BLUE,
-                       (int(self.x - 8), int(self.y - 2), 16, 12),
+                       (x - 8, y - 2, 16, 12),
                        math.pi, 2 * math.pi, 2)
 
 
 class Planet:
-    def __init__(self, name, x, y, radius, color, is_slideshow=False, is_notes=False, has_smiley=False):
+    def __init__(self, name, x, y, radius, color, is_slideshow=False, is_notes=False, has_smiley=False,
+                 interactive=True, facts=None, questions=None, planet_id=None):
         self.name = name
+        self.planet_id = planet_id or name  # language independent key for saved progress
         self.x = x
         self.y = y
         self.radius = radius
@@ -375,11 +1901,16 @@ class Planet:
         self.is_slideshow = is_slideshow
         self.is_notes = is_notes
         self.has_smiley = has_smiley
-
-    def draw(self, screen, font):
-        pygame.draw.circle(screen, self.color, (self.x, self.y), self.radius)
+        self.interactive = interactive  # decorative bodies cannot be visited
+        self.facts = facts or []
+        self.questions = questions or []
+
+    def draw(self, screen, font, offset=(0, 0)):
+        x = self.x - offset[0]
+        y = self.y - offset[1]
+        pygame.draw.circle(screen, self.color, (x, y), self.radius)
         # Glow effect
-        pygame.draw.circle(screen, self.color, (self.x, self.y), self.radius + 5, 2)
+        pygame.draw.circle(screen, self.color, (x, y), self.radius + 5, 2)
 
         # Draw smiley face if enabled
         if self.has_smiley:
@@ -387,176 +1918,177 @@ class Planet:
             eye_offset_x = self.radius // 3
             eye_offset_y = self.radius // 4
             eye_size = self.radius // 8
-            pygame.draw.circle(screen, BLACK, (self.x - eye_offset_x, self.y - eye_offset_y), eye_size)
-            pygame.draw.circle(screen, BLACK, (self.x + eye_offset_x, self.y - eye_offset_y), eye_size)
+            pygame.draw.circle(screen, BLACK, (x - eye_offset_x, y - eye_offset_y), eye_size)
+            pygame.draw.circle(screen, BLACK, (x + eye_offset_x, y - eye_offset_y), eye_size)
 
             # Smile
-            smile_rect = pygame.Rect(self.x - self.radius // 2, self.y - self.radius // 4,
+            smile_rect = pygame.Rect(x - self.radius // 2, y - self.radius // 4,
                                     self.radius, self.radius)
             pygame.draw.arc(screen, BLACK, smile_rect, math.pi, 2 * math.pi, 4)
 
         # Name
-        text = font.render(self.name, True, WHITE)
-        text_rect = text.get_rect(center=(self.x, self.y + self.radius + 20))
-        screen.blit(text, text_rect)
-
-    def check_collision(self, astronaut):
-        distance = math.sqrt((self.x - astronaut.x) ** 2 + (self.y - astronaut.y) ** 2)
-        return distance < self.radius + astronaut.size + 20
-
-    def get_info(self):
-        info_dict = {
-            "Mercur": [
-                "Cea mai apropiata planeta de Soare",
-                "Cea mai mica planeta din sistemul solar",
-                "Un an dureaza doar 88 de zile pamantesti!",
-                "Temperatura suprafetei: -173°C pana la 427°C"
-            ],
-            "Venus": [
-                "A doua planeta de la Soare",
-                "Cea mai fierbinte planeta din sistem",
-                "Atmosfera densa de dioxid de carbon",
-                "O zi este mai lunga decat un an!"
-            ],
-            "Pamant": [
-                "Planeta noastra!",
-                "Singura planeta cunoscuta cu viata",
-                "71% acoperita cu apa",
-                "La distanta perfecta de Soare"
-            ],
-            "Marte": [
-                "Planeta Rosie",
-                "Are cel mai mare vulcan: Olympus Mons",
-                "Doua luni mici: Phobos si Deimos",
-                "Posibila viitoare colonie umana"
-            ],
-            "Jupiter": [
-                "Cea mai mare planeta din sistemul solar",
-                "O uriasa gazoasa fara suprafata solida",
-                "Celebra Pata Rosie Mare este o furtuna",
-                "Are 79 de sateliti cunoscuti!"
-            ],
-            "Saturn": [
-                "Celebra pentru inelele sale frumoase",
-                "A doua cea mai mare planeta",
-                "Formata in mare parte din hidrogen si heliu",
-                "Are 82 de sateliti cunoscuti"
-            ],
-            "Uranus": [
-                "Se roteste pe o parte!",
-                "Planeta uriasa de gheata",
-                "Cea mai rece atmosfera planetara",
-                "Are 13 inele slabe"
-            ],
-            "Neptun": [
-                "Cea mai indepartata planeta de Soare",
-                "Cele mai puternice vanturi din sistem",
-                "Culoare albastra frumoasa din metan",
-                "Are 14 sateliti cunoscuti"
-            ]
-        }
-        return info_dict.get(self.name, ["Informatii indisponibile"])
+        if self.name:
+            text = font.render(self.name, True, WHITE)
+            text_rect = text.get_rect(center=(x, y + self.radius + 20))
+            screen.blit(text, text_rect)
+
+
+class QuestionDeck:
+    """Chooses quiz questions from one planet's bank.
+
+    Questions are drawn without replacement until the whole bank has been
+    asked, using a partial Fisher-Yates shuffle so a quiz of k questions
+    costs O(k) whatever the bank size. Missed questions go into review
+    boxes and come back after REVIEW_INTERVALS quizzes until they are
+    answered correctly in every box.
+    """
+    def __init__(self, bank, rng=None):
+        self.bank = bank
+        self.rng = rng or random  # the shared generator, seeded by --seed
+        self.order = list(range(len(bank)))
+        self.remaining = len(bank)  # order[:remaining] has not been asked in this pass
+        self.quiz_number = 0
+        self.review = {}  # question index -> (box, quiz number it is due)
+        self._fingerprint = None
+
+    def draw_new(self):
+        if not self.remaining:
+            self.remaining = len(self.order)
+        j = self.rng.randrange(self.remaining)
+        self.remaining -= 1
+        last = self.remaining
+        self.order[j], self.order[last] = self.order[last], self.order[j]
+        return self.order[last]
+
+    def deal(self, count=QUIZ_LENGTH):
+        """Indexes of the questions for the next quiz"""
+        self.quiz_number += 1
+        count = min(count, len(self.bank))
+        due = [index for index, (box, due_at) in self.review.items() if due_at <= self.quiz_number]
+        due.sort(key=lambda index: self.review[index][1])
+        chosen = due[:count]
+        seen = set(chosen)
+        # A bank smaller than the quiz can only be dealt once per pass
+        attempts = len(self.bank) * 2
+        while len(chosen) < count and attempts:
+            index = self.draw_new()
+            attempts -= 1
+            if index not in seen:
+                seen.add(index)
+                chosen.append(index)
+        self.rng.shuffle(chosen)
+        return chosen
+
+    def fingerprint(self):
+        """Hash of the bank; a saved deck only fits the bank it was dealt from"""
+        if self._fingerprint is None:
+            text = json.dumps([[question["q"], question["a"]] for question in self.bank], ensure_ascii=False)
+            self._fingerprint = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        return self._fingerprint
+
+    def snapshot(self):
+        """Deck state as plain lists, for JSON (progress store) and marshal (replays)"""
+        return {"bank": self.fingerprint(), "order": list(self.order), "remaining": self.remaining,
+                "quiz_number": self.quiz_number,
+                "review": [[index, box, due] for index, (box, due) in self.review.items()]}
+
+    def restore(self, data):
+        """Continue from a snapshot(); False, leaving the deck as it is, if the bank has changed"""
+        if data.get("bank") != self.fingerprint() or sorted(data["order"]) != list(range(len(self.bank))):
+            return False
+        self.order = list(data["order"])
+        self.remaining = data["remaining"]
+        self.quiz_number = data["quiz_number"]
+        self.review = {index: (box, due) for index, box, due in data["review"]}
+        return True
+
+    def record(self, index, correct):
+        """Update the review boxes with the answer to one question"""
+        if not correct:
+            self.review[index] = (0, self.quiz_number + REVIEW_INTERVALS[0])
+        elif index in self.review:
+            box = self.review[index][0] + 1
+            if box < len(REVIEW_INTERVALS):
+                self.review[index] = (box, self.quiz_number + REVIEW_INTERVALS[box])
+            else:
+                del self.review[index]
 
 
 class Quiz:
-    def __init__(self, planet_name):
-        self.planet_name = planet_name
-        self.questions = self.get_questions(planet_name)
+    def __init__(self, deck, length=QUIZ_LENGTH):
+        self.deck = deck
+        self.indexes = deck.deal(length)
+        self.questions = [self.shuffled(deck.bank[index]) for index in self.indexes]
+        self.answers = []  # (question text, correct) not yet saved by the game
         self.current_question = 0
         self.score = 0
         self.selected_answer = None
         self.answered = False
-        self.finished = False
-
-    def get_questions(self, planet_name):
-        questions_dict = {
-            "Mercur": [
-                {"q": "Mercur este planeta _____ de Soare", "a": ["Cea mai apropiata", "Cea mai indepartata", "A doua", "A treia"], "c": 0},
-                {"q": "Cat dureaza un an pe Mercur?", "a": ["88 zile", "365 zile", "12 zile", "200 zile"], "c": 0},
-                {"q": "Mercur este planeta _____", "a": ["Cea mai mica", "Cea mai mare", "Cea mai fierbinte", "Cea mai rece"], "c": 0},
-                {"q": "Are Mercur atmosfera?", "a": ["Foarte subtire", "Densa", "Deloc", "Ca Pamantul"], "c": 0},
-                {"q": "Mercur are _____ extreme", "a": ["Temperaturi", "Vanturi", "Ploi", "Nori"], "c": 0}
-            ],
-            "Venus": [
-                {"q": "Venus este _____ planeta de la Soare", "a": ["A doua", "Prima", "A treia", "A patra"], "c": 0},
-                {"q": "Venus este planeta _____", "a": ["Cea mai fierbinte", "Cea mai rece", "Cea mai mare", "Cea mai mica"], "c": 0},
-                {"q": "Venus are o atmosfera densa de _____", "a": ["CO2", "Oxigen", "Azot", "Hidrogen"], "c": 0},
-                {"q": "Pe Venus, o zi este _____ decat un an", "a": ["Mai lunga", "Mai scurta", "La fel", "Dublu"], "c": 0},
-                {"q": "Venus poarta numele zeitei _____", "a": ["Iubirii", "Razboiului", "Marii", "Cerului"], "c": 0}
-            ],
-            "Pamant": [
-                {"q": "Pamantul este acoperit _____ cu apa", "a": ["71%", "50%", "30%", "90%"], "c": 0},
-                {"q": "Pamantul este _____ planeta de la Soare", "a": ["A treia", "A doua", "A patra", "Prima"], "c": 0},
-                {"q": "Pamantul are _____ satelit(i)", "a": ["Unul", "Doi", "Deloc", "Trei"], "c": 0},
-                {"q": "Ce face Pamantul special?", "a": ["Are viata", "Cel mai mare", "Cel mai fierbinte", "Cel mai rapid"], "c": 0},
-                {"q": "Atmosfera Pamantului este formata din", "a": ["Azot", "Oxigen", "CO2", "Heliu"], "c": 0}
-            ],
-            "Marte": [
-                {"q": "Marte este numita planeta _____", "a": ["Rosie", "Albastra", "Verde", "Galbena"], "c": 0},
-                {"q": "Marte are _____ sateliti", "a": ["Doi", "Unu", "Deloc", "Patru"], "c": 0},
-                {"q": "Cel mai mare vulcan este _____", "a": ["Olympus Mons", "Mt. Everest", "Krakatoa", "Vesuvius"], "c": 0},
-                {"q": "Marte este _____ decat Pamantul", "a": ["Mai mica", "Mai mare", "Aceeasi marime", "De doua ori mai mare"], "c": 0},
-                {"q": "Marte ar fi putut avea odata _____", "a": ["Apa", "Doar viata", "Orase", "Copaci"], "c": 0}
-            ],
-            "Jupiter": [
-                {"q": "Jupiter este planeta _____", "a": ["Cea mai mare", "Cea mai mica", "Cea mai fierbinte", "Cea mai apropiata"], "c": 0},
-                {"q": "Jupiter este o uriasa _____", "a": ["Gazoasa", "De gheata", "Stancоasa", "Metalica"], "c": 0},
-                {"q": "Marea Pata Rosie a lui Jupiter este o", "a": ["Furtuna", "Munte", "Ocean", "Desert"], "c": 0},
-                {"q": "Jupiter are aproximativ _____ sateliti", "a": ["79", "1", "12", "200"], "c": 0},
-                {"q": "Ai putea sta in picioare pe Jupiter?", "a": ["Nu", "Da", "Poate", "Uneori"], "c": 0}
-            ],
-            "Saturn": [
-                {"q": "Saturn este celebru pentru _____", "a": ["Inele", "Culoare", "Marime", "Viteza"], "c": 0},
-                {"q": "Saturn este _____ cea mai mare planeta", "a": ["A doua", "Prima", "A treia", "A patra"], "c": 0},
-                {"q": "Saturn este format in mare parte din _____", "a": ["Hidrogen", "Piatra", "Apa", "Fier"], "c": 0},
-                {"q": "Saturn are _____ sateliti", "a": ["82", "1", "10", "5"], "c": 0},
-                {"q": "Saturn este o uriasa _____", "a": ["Gazoasa", "De gheata", "Stancоasa", "Metalica"], "c": 0}
-            ],
-            "Uranus": [
-                {"q": "Uranus se roteste pe _____", "a": ["O parte", "Varful", "Normal", "Baza"], "c": 0},
-                {"q": "Uranus este o uriasa de _____", "a": ["Gheata", "Gaz", "Piatra", "Metal"], "c": 0},
-                {"q": "Uranus are _____ inele", "a": ["13", "0", "1", "100"], "c": 0},
-                {"q": "Uranus are cea mai rece _____", "a": ["Atmosfera", "Nucleu", "Inele", "Sateliti"], "c": 0},
-                {"q": "Ce culoare este Uranus?", "a": ["Albastru-verde", "Rosu", "Galben", "Violet"], "c": 0}
-            ],
-            "Neptun": [
-                {"q": "Neptun este planeta _____ de Soare", "a": ["Cea mai indepartata", "Cea mai apropiata", "A doua", "A treia"], "c": 0},
-                {"q": "Neptun are cele mai puternice _____", "a": ["Vanturi", "Inele", "Gravitatie", "Caldura"], "c": 0},
-                {"q": "Culoarea albastra a lui Neptun vine de la", "a": ["Metan", "Apa", "Gheata", "Nori"], "c": 0},
-                {"q": "Neptun are _____ sateliti", "a": ["14", "1", "0", "100"], "c": 0},
-                {"q": "Neptun este o uriasa de _____", "a": ["Gheata", "Gaz", "Piatra", "Foc"], "c": 0}
-            ]
-        }
-        return questions_dict.get(planet_name, [])
+        self.finished = not self.questions  # an empty bank has nothing to ask
+
+    def shuffled(self, question):
+        """Copy of question with the answers in random order"""
+        answers = list(question["a"])
+        correct = answers[question.get("c", 0)]
+        self.deck.rng.shuffle(answers)
+        return {"q": question["q"], "a": answers, "c": answers.index(correct)}
+
+    def is_perfect(self):
+        return bool(self.questions) and self.score == len(self.questions)
+
+    def snapshot(self):
+        return {"indexes": list(self.indexes), "questions": [dict(q, a=list(q["a"])) for q in self.questions],
+                "current_question": self.current_question, "score": self.score,
+                "selected_answer": self.selected_answer, "answered": self.answered,
+                "finished": self.finished}
+
+    @classmethod
+    def from_snapshot(cls, deck, data):
+        """Quiz in the state of a snapshot, without dealing new questions from deck"""
+        quiz = cls.__new__(cls)
+        quiz.deck = deck
+        quiz.answers = []
+        quiz.indexes = list(data["indexes"])
+        quiz.questions = [dict(q, a=list(q["a"])) for q in data["questions"]]
+        for name in ("current_question", "score", "selected_answer", "answered", "finished"):
+            setattr(quiz, name, data[name])
+        return quiz
 
     def handle_event(self, event):
+        if self.finished:
+            return
         if event.type == pygame.MOUSEBUTTONDOWN and not self.answered:
-            mouse_pos = pygame.mouse.get_pos()
+            mouse_pos = event.pos
+            question = self.questions[self.current_question]
             # Check which answer was clicked
-            for i in range(4):
-                answer_rect = pygame.Rect(SCREEN_WIDTH // 2 - 300, 300 + i * 70, 600, 50)
+            for i in range(len(question["a"])):
+                answer_rect = pygame.Rect(SCREEN_WIDTH // 2 - ANSWER_BUTTON_WIDTH // 2, 300 + i * 70,
+                                          ANSWER_BUTTON_WIDTH, 50)
                 if answer_rect.collidepoint(mouse_pos):
                     self.selected_answer = i
                     self.answered = True
-                    if i == self.questions[self.current_question]["c"]:
+                    correct = i == question["c"]
+                    if correct:
                         self.score += 1
+                    self.deck.record(self.indexes[self.current_question], correct)
+                    self.answers.append((question["q"], correct))
                     break
 
         elif event.type == pygame.KEYDOWN and self.answered:
             self.current_question += 1
             self.answered = False
             self.selected_answer = None
-            if self.current_question >= 5:
+            if self.current_question >= len(self.questions):
                 self.finished = True
 
     def draw(self, screen, font_medium, font_small):
         screen.fill(SPACE_BLUE)
 
-        if self.current_question < 5:
+        if self.current_question < len(self.questions):
             question = self.questions[self.current_question]
 
             # Question number
-            q_num = font_medium.render(f"Intrebarea {self.current_question + 1}/5", True, YELLOW)
+            q_num = font_medium.render(f"Intrebarea {self.current_question + 1}/{len(self.questions)}", True, YELLOW, volatile=True)
             screen.blit(q_num, (SCREEN_WIDTH // 2 - q_num.get_width() // 2, 100))
 
             # Question text
@@ -565,7 +2097,8 @@ class Quiz:
 
             # Answer options
             for i, answer in enumerate(question["a"]):
-                answer_rect = pygame.Rect(SCREEN_WIDTH // 2 - 300, 300 + i * 70, 600, 50)
+                answer_rect = pygame.Rect(SCREEN_WIDTH // 2 - ANSWER_BUTTON_WIDTH // 2, 300 + i * 70,
+                                          ANSWER_BUTTON_WIDTH, 50)
 
                 if self.answered:
                     if i == question["c"]:
@@ -589,107 +2122,667 @@ class Quiz:
                 screen.blit(prompt, (SCREEN_WIDTH // 2 - prompt.get_width() // 2, 650))
 
         # Score
-        score_text = font_small.render(f"Scor: {self.score}/5", True, YELLOW)
+        score_text = font_small.render(f"Scor: {self.score}/{len(self.questions)}", True, YELLOW, volatile=True)
         screen.blit(score_text, (20, 20))
 
 
-class DodgeGame:
+def read_content_file(path):
+    """Parse a JSON or TOML content file"""
+    if path.endswith(".toml"):
+        if tomllib is None:
+            raise ValueError("TOML content needs Python 3.11+")
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_fields(entry, fields, where):
+    """Raise ValueError unless entry is a dict whose listed fields have the given types"""
+    if not isinstance(entry, dict):
+        raise ValueError(f"{where}: expected an object")
+    for name, kind in fields.items():
+        if name in entry and not isinstance(entry[name], kind):
+            raise ValueError(f"{where}: '{name}' has the wrong type")
+
+
+def validate_planet(entry, where):
+    check_fields(entry, {"id": str, "x": int, "y": int, "radius": int, "color": list,
+                         "kind": str, "smiley": bool}, where)
+    for name in ("id", "x", "y", "radius", "color"):
+        if name not in entry:
+            raise ValueError(f"{where}: missing '{name}'")
+    if len(entry["color"]) != 3 or not all(isinstance(c, int) and 0 <= c <= 255 for c in entry["color"]):
+        raise ValueError(f"{where}: 'color' must be three numbers between 0 and 255")
+    if entry.get("kind", "quiz") not in PLANET_KINDS:
+        raise ValueError(f"{where}: unknown kind '{entry['kind']}'")
+
+
+def validate_planet_text(entry, where):
+    check_fields(entry, {"name": str, "facts": list, "questions": list}, where)
+    if not all(isinstance(fact, str) for fact in entry.get("facts", [])):
+        raise ValueError(f"{where}: facts must be text")
+    for number, question in enumerate(entry.get("questions", []), 1):
+        validate_question(question, f"{where} question {number}")
+
+
+def validate_question(question, where):
+    check_fields(question, {"q": str, "a": list, "c": int}, where)
+    if "q" not in question or "a" not in question:
+        raise ValueError(f"{where}: missing 'q' or 'a'")
+    if len(question["a"]) < 2 or not all(isinstance(answer, str) for answer in question["a"]):
+        raise ValueError(f"{where}: needs at least two text answers")
+    if len(question["a"]) > QUIZ_MAX_ANSWERS:
+        raise ValueError(f"{where}: more than {QUIZ_MAX_ANSWERS} answers")
+    if not 0 <= question.get("c", 0) < len(question["a"]):
+        raise ValueError(f"{where}: 'c' is not one of the answers")
+
+
+class ContentPack:
+    """Planets, facts and quiz banks for one language.
+
+    The content lives in CONTENT_DIR as planets.json (positions and looks)
+    plus one file per planet and language with its name, facts and
+    questions. Files are validated when they are compiled; the compiled
+    pack is kept in a marshal file named after the hash of the sources, so
+    later starts skip parsing and validation until the content changes.
+    """
+    def __init__(self, language=CONTENT_LANGUAGE, folder=CONTENT_DIR, cache_dir=CONTENT_CACHE_DIR):
+        self.language = language
+        self.folder = folder
+        self.cache_dir = cache_dir
+        self.planets = []
+        self.load()
+
+    def source_files(self):
+        files = [os.path.join(self.folder, "planets.json")]
+        for language in sorted({self.language, DEFAULT_LANGUAGE}):
+            folder = os.path.join(self.folder, language)
+            if os.path.isdir(folder):
+                files.extend(os.path.join(folder, name) for name in sorted(os.listdir(folder))
+                             if name.endswith((".json", ".toml")))
+        return files
+
+    def content_hash(self, files):
+        digest = hashlib.sha1(f"{CONTENT_CACHE_VERSION}|{self.language}|{DEFAULT_LANGUAGE}".encode())
+        for path in files:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                data = b""
+            digest.update(f"|{os.path.relpath(path, self.folder)}|{len(data)}|".encode())
+            digest.update(data)
+        return digest.hexdigest()
+
+    def load(self):
+        files = self.source_files()
+        cache_path = os.path.join(self.cache_dir, f"{self.language}-{self.content_hash(files)}.marshal")
+        try:
+            with open(cache_path, "rb") as f:
+                self.planets = marshal.load(f)
+            return
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        self.planets = self.compile()
+        self.save_cache(cache_path)
+
+    def read_texts(self, language):
+        """Planet texts of one language keyed by planet id"""
+        texts = {}
+        folder = os.path.join(self.folder, language)
+        if not os.path.isdir(folder):
+            return texts
+        for name in sorted(os.listdir(folder)):
+            if not name.endswith((".json", ".toml")):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                entry = read_content_file(path)
+                validate_planet_text(entry, name)
+            except (OSError, ValueError) as e:
+                print(f"Skipping content file {path}: {e}")
+                continue
+            texts[os.path.splitext(name)[0]] = entry
+        return texts
+
+    def compile(self):
+        """Read and validate the content files into plain planet dicts"""
+        path = os.path.join(self.folder, "planets.json")
+        try:
+            entries = read_content_file(path)
+        except (OSError, ValueError) as e:
+            print(f"Error loading {path}: {e}")
+            return []
+        if not isinstance(entries, list):
+            print(f"Error loading {path}: expected a list of planets")
+            return []
+
+        texts = self.read_texts(self.language)
+        fallback = texts if self.language == DEFAULT_LANGUAGE else self.read_texts(DEFAULT_LANGUAGE)
+        planets = []
+        for number, entry in enumerate(entries, 1):
+            try:
+                validate_planet(entry, f"{path} planet {number}")
+            except ValueError as e:
+                print(f"Skipping {e}")
+                continue
+            text = texts.get(entry["id"], {})
+            default_text = fallback.get(entry["id"], {})
+            questions = text.get("questions") or default_text.get("questions") or []
+            if entry.get("kind", "quiz") == "quiz" and not questions:
+                # Its quiz would have nothing to ask, e.g. after its text file failed validation
+                print(f"Skipping {path} planet {number}: quiz planet '{entry['id']}' has no questions")
+                continue
+            planets.append({
+                "id": entry["id"],
+                "name": text.get("name") or default_text.get("name") or entry["id"],
+                "x": entry["x"],
+                "y": entry["y"],
+                "radius": entry["radius"],
+                "color": tuple(entry["color"]),
+                "kind": entry.get("kind", "quiz"),
+                "smiley": entry.get("smiley", False),
+                "facts": text.get("facts") or default_text.get("facts") or [],
+                "questions": questions,
+            })
+        return planets
+
+    def save_cache(self, cache_path):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Drop packs compiled from older versions of the content
+            for name in os.listdir(self.cache_dir):
+                if name.startswith(f"{self.language}-") and name.endswith(".marshal"):
+                    os.remove(os.path.join(self.cache_dir, name))
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                marshal.dump(self.planets, f)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Error saving content cache: {e}")
+
+    def create_planets(self):
+        return [Planet(entry["name"], entry["x"], entry["y"], entry["radius"], entry["color"],
+                       is_slideshow=entry["kind"] == "slideshow", is_notes=entry["kind"] == "notes",
+                       has_smiley=entry["smiley"], facts=entry["facts"], questions=entry["questions"],
+                       planet_id=entry["id"])
+                for entry in self.planets]
+
+
+# Letters of other scripts that look like Latin ones, as the Cyrillic o in "Stanc\u043easa"
+HOMOGLYPHS = {
+    "\u0430": "a", "\u0435": "e", "\u043e": "o", "\u0440": "p", "\u0441": "c", "\u0443": "y",
+    "\u0445": "x", "\u0456": "i", "\u0458": "j", "\u0455": "s", "\u0410": "A", "\u0412": "B",
+    "\u0415": "E", "\u041a": "K", "\u041c": "M", "\u041d": "H", "\u041e": "O", "\u0420": "P",
+    "\u0421": "C", "\u0422": "T", "\u0425": "X", "\u03bf": "o", "\u03b1": "a", "\u03bd": "v",
+    "\u03c1": "p", "\u0391": "A", "\u0392": "B", "\u0395": "E", "\u039a": "K", "\u039c": "M",
+    "\u039d": "N", "\u039f": "O", "\u03a1": "P", "\u03a4": "T", "\u03a7": "X",
+}
+# Romanian letters with a cedilla, which should be written with a comma below
+CEDILLA_LETTERS = {"\u015f": "\u0219", "\u0163": "\u021b", "\u015e": "\u0218", "\u0162": "\u021a"}
+
+
+def letter_script(ch):
+    """Script of a letter from its Unicode name, e.g. LATIN or CYRILLIC"""
+    return unicodedata.name(ch, "UNKNOWN").split(" ", 1)[0]
+
+
+def bank_strings(entry):
+    """(where, text) of every string in a planet text file"""
+    if not isinstance(entry, dict):
+        return
+    if isinstance(entry.get("name"), str):
+        yield "name", entry["name"]
+    for number, fact in enumerate(entry.get("facts") or [], 1):
+        if isinstance(fact, str):
+            yield f"fact {number}", fact
+    for number, question in enumerate(entry.get("questions") or [], 1):
+        if not isinstance(question, dict):
+            continue
+        if isinstance(question.get("q"), str):
+            yield f"question {number}", question["q"]
+        for answer_number, answer in enumerate(question.get("a") or [], 1):
+            if isinstance(answer, str):
+                yield f"question {number} answer {answer_number}", answer
+
+
+def check_text_encoding(text, script, language):
+    """Problems in one string of a bank written in script"""
+    if text.isascii() and text.isprintable():
+        return []  # plain ASCII cannot hide any of the problems below
+    problems = []
+    for position, ch in enumerate(text):
+        category = unicodedata.category(ch)
+        if category in ("Cc", "Cf"):
+            problems.append(f"invisible character U+{ord(ch):04X} at {position + 1}")
+        elif ch.isalpha() and letter_script(ch) != script:
+            lookalike = HOMOGLYPHS.get(ch)
+            hint = f", looks like '{lookalike}'" if lookalike else ""
+            problems.append(f"{unicodedata.name(ch, 'unknown letter')} (U+{ord(ch):04X}) "
+                            f"in {script.lower()} text at {position + 1}{hint}")
+        elif language == "ro" and ch in CEDILLA_LETTERS:
+            problems.append(f"'{ch}' at {position + 1} has a cedilla, write '{CEDILLA_LETTERS[ch]}'")
+    if unicodedata.normalize("NFC", text) != text:
+        problems.append("not in NFC form (separate combining accents)")
+    return problems
+
+
+def check_bank(path, language):
+    """Structure and encoding problems of one planet text file; runs on a worker thread"""
+    result = {"path": path, "language": language, "planet": os.path.splitext(os.path.basename(path))[0],
+              "questions": [], "errors": [], "warnings": []}
+    try:
+        entry = read_content_file(path)
+        check_fields(entry, {"name": str, "facts": list, "questions": list}, path)
+    except (OSError, ValueError) as e:
+        # UnicodeDecodeError and JSONDecodeError are ValueErrors too
+        result["errors"].append(f"{path}: {e}")
+        return result
+
+    seen_questions = set()
+    for number, question in enumerate(entry.get("questions") or [], 1):
+        where = f"{path} question {number}"
+        try:
+            validate_question(question, where)
+        except ValueError as e:
+            result["errors"].append(str(e))
+            continue
+        folded = [fold_text(answer.strip()) for answer in question["a"]]
+        if len(set(folded)) < len(folded):
+            result["errors"].append(f"{where}: two answers are the same")
+        if not all(folded) or not question["q"].strip():
+            result["errors"].append(f"{where}: empty question or answer")
+        if question["q"] in seen_questions:
+            result["warnings"].append(f"{where}: asked twice in this file")
+        seen_questions.add(question["q"])
+        result["questions"].append(question)
+
+    strings = list(bank_strings(entry))
+    scripts = Counter()
+    for _, text in strings:
+        if text.isascii():
+            scripts["LATIN"] += len(text)
+        else:
+            scripts.update(letter_script(ch) for ch in text if ch.isalpha())
+    script = scripts.most_common(1)[0][0] if scripts else "LATIN"
+    for where, text in strings:
+        for problem in check_text_encoding(text, script, language):
+            result["errors"].append(f"{path} {where}: {problem}")
+    return result
+
+
+def answer_statistics(db_file, banks):
+    """Aggregate answer counts from a progress database, opened read-only.
+
+    None when the database does not exist; sqlite3.Error when it cannot be read.
+    """
+    if not os.path.exists(db_file):
+        return None
+    known = {(bank["planet"], question["q"]) for bank in banks for question in bank["questions"]}
+    connection = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True)
+    try:
+        rows = connection.execute("SELECT planet, question, COUNT(*), SUM(correct), COUNT(DISTINCT profile) "
+                                  "FROM answers GROUP BY planet, question").fetchall()
+        students = connection.execute("SELECT COUNT(DISTINCT profile) FROM answers").fetchone()[0]
+    finally:
+        connection.close()
+
+    planets = {}
+    for planet, question, count, correct, _ in rows:
+        totals = planets.setdefault(planet, [0, 0])
+        totals[0] += count
+        totals[1] += correct
+    answered = [row for row in rows if row[2] >= HARDEST_MIN_ANSWERS]
+    answered.sort(key=lambda row: (row[3] / row[2], -row[2]))
+    total = sum(row[2] for row in rows)
+    return {
+        "answers": total,
+        "students": students,
+        "correct_rate": round(sum(row[3] for row in rows) / total, 3) if total else None,
+        "planets": {planet: {"answers": count, "correct_rate": round(correct / count, 3)}
+                    for planet, (count, correct) in sorted(planets.items())},
+        "hardest": [{"planet": planet, "question": question, "answers": count,
+                     "correct_rate": round(correct / count, 3), "students": students_asked}
+                    for planet, question, count, correct, students_asked in answered[:HARDEST_QUESTIONS]],
+        # Answers to questions that were since edited or removed from the banks
+        "unknown_questions": sum(1 for row in rows if (row[0], row[1]) not in known),
+    }
+
+
+def validate_content(folder=CONTENT_DIR, db_file=PROGRESS_FILE):
+    """Check every quiz bank in folder; a JSON-ready report"""
+    start = time.perf_counter()
+    errors = []
+    warnings = []
+    planet_ids = set()
+    planets_path = os.path.join(folder, "planets.json")
+    try:
+        entries = read_content_file(planets_path)
+        if not isinstance(entries, list):
+            raise ValueError("expected a list of planets")
+        for number, entry in enumerate(entries, 1):
+            try:
+                validate_planet(entry, f"{planets_path} planet {number}")
+                planet_ids.add(entry["id"])
+            except ValueError as e:
+                errors.append(str(e))
+    except (OSError, ValueError) as e:
+        errors.append(f"{planets_path}: {e}")
+
+    files = []
+    try:
+        languages = sorted(name for name in os.listdir(folder) if os.path.isdir(os.path.join(folder, name)))
+    except OSError as e:
+        errors.append(f"{folder}: {e.strerror}")
+        languages = []
+    for language in languages:
+        language_folder = os.path.join(folder, language)
+        files.extend((os.path.join(language_folder, name), language) for name in sorted(os.listdir(language_folder))
+                     if name.endswith((".json", ".toml")))
+
+    # Reading and parsing overlap on a pool; the checks themselves are plain Python
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        banks = list(executor.map(lambda item: check_bank(*item), files))
+
+    # Text measurement stays on this thread, FreeType faces must not be shared between threads
+    font = FontWrapper(SMALL_FONT_SIZE)
+    widths = {}
+    question_count = 0
+    for bank in banks:
+        errors.extend(bank["errors"])
+        warnings.extend(bank["warnings"])
+        if planet_ids and bank["planet"] not in planet_ids:
+            warnings.append(f"{bank['path']}: no planet '{bank['planet']}' in {planets_path}")
+        for number, question in enumerate(bank["questions"], 1):
+            question_count += 1
+            for text in [question["q"]] + question["a"]:
+                if text not in widths:
+                    widths[text] = font.measure(text)[0]
+            for answer in question["a"]:
+                if widths[answer] > ANSWER_BUTTON_WIDTH:
+                    errors.append(f"{bank['path']}: answer '{answer}' is {widths[answer]}px wide, "
+                                  f"the button is {ANSWER_BUTTON_WIDTH}px")
+            if widths[question["q"]] > SCREEN_WIDTH:
+                warnings.append(f"{bank['path']}: question '{question['q']}' is wider than the screen")
+    try:
+        statistics = answer_statistics(db_file, banks)
+    except sqlite3.Error as e:
+        # Not a progress database, or one from before the answers table
+        errors.append(f"{db_file}: {e}")
+        statistics = None
+    for language in languages:
+        present = {bank["planet"] for bank in banks if bank["language"] == language}
+        for planet in sorted(planet_ids - present):
+            warnings.append(f"{os.path.join(folder, language)}: no text for planet '{planet}'")
+
+    return {
+        "files": len(files),
+        "languages": languages,
+        "questions": question_count,
+        "errors": errors,
+        "warnings": warnings,
+        "statistics": statistics,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+class AsteroidField:
+    """Asteroids stored as parallel array columns instead of one dict each.
+
+    Moving, culling and the collision test against the player happen in a
+    single pass, over the whole columns at once when numpy is loaded. Both
+    paths compute in double precision and keep the order of the survivors,
+    so they leave the same columns, bit for bit, and replays do not depend
+    on whether numpy is installed.
+    """
+    sprites = {}
+
     def __init__(self):
+        self.x = array('f')
+        self.y = array('f')
+        self.size = array('i')
+        self.speed = array('f')
+
+    def __len__(self):
+        return len(self.y)
+
+    def spawn(self, x, y, size, speed):
+        self.x.append(x)
+        self.y.append(y)
+        self.size.append(size)
+        self.speed.append(speed)
+
+    def update(self, dt, player_x, player_y, player_size, bottom):
+        """Move all asteroids dt seconds and drop those below bottom; True if one hits the player"""
+        if numpy is not None:
+            return self.update_columns(dt, player_x, player_y, player_size, bottom)
+        xs, ys, sizes, speeds = self.x, self.y, self.size, self.speed
+        hit = False
+        kept = 0
+        for i in range(len(ys)):
+            y = ys[i] + speeds[i] * dt
+            if y > bottom:
+                continue
+
+            # Squared distance, with a cheap horizontal reject first
+            reach = sizes[i] + player_size
+            dx = xs[i] - player_x
+            if -reach < dx < reach:
+                dy = y - player_y
+                if dx * dx + dy * dy < reach * reach:
+                    hit = True
+
+            # Survivors move up over the dropped ones, keeping their order
+            if kept != i:
+                xs[kept] = xs[i]
+                sizes[kept] = sizes[i]
+                speeds[kept] = speeds[i]
+            ys[kept] = y
+            kept += 1
+
+        if kept < len(ys):
+            del xs[kept:], ys[kept:], sizes[kept:], speeds[kept:]
+        return hit
+
+    def update_columns(self, dt, player_x, player_y, player_size, bottom):
+        """update() with numpy, on views of the columns"""
+        xs = numpy.frombuffer(self.x, numpy.float32)
+        ys = numpy.frombuffer(self.y, numpy.float32)
+        sizes = numpy.frombuffer(self.size, numpy.intc)
+        speeds = numpy.frombuffer(self.speed, numpy.float32)
+        y = ys.astype(numpy.float64) + speeds.astype(numpy.float64) * dt
+        keep = y <= bottom
+
+        reach = sizes + player_size
+        dx = xs.astype(numpy.float64) - player_x
+        dy = y - player_y
+        hit = bool((keep & (dx * dx + dy * dy < reach * reach)).any())
+
+        ys[:] = y
+        kept = int(numpy.count_nonzero(keep))
+        if kept < len(keep):
+            for column in (xs, ys, sizes, speeds):
+                column[:kept] = column[keep]
+            # The views must go before the columns can shrink
+            del xs, ys, sizes, speeds, column
+            del self.x[kept:], self.y[kept:], self.size[kept:], self.speed[kept:]
+        return hit
+
+    @classmethod
+    def sprite(cls, size):
+        """Asteroid drawn once per size, so drawing is a single blit"""
+        surface = cls.sprites.get(size)
+        if surface is None:
+            # A run-length encoded colorkey blits much faster than per-pixel alpha
+            surface = pygame.Surface((size * 2 + 1, size * 2 + 1))
+            surface.fill(BLACK)
+            pygame.draw.circle(surface, ASTEROID_COLOR, (size, size), size)
+            pygame.draw.circle(surface, ASTEROID_EDGE_COLOR, (size, size), size, 3)
+            surface.set_colorkey(BLACK, pygame.RLEACCEL)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            cls.sprites[size] = surface
+        return surface
+
+    def draw(self, screen, return_rects=True, lag=0.0):
+        """Blit every asteroid lag seconds behind the simulation; returns the rects if asked to.
+
+        With numpy, asteroids already below the screen (they are dropped a
+        little further down) are culled before the blit list is built.
+        """
+        sprites = self.sprites
+        sprite = self.sprite
+        if numpy is not None:
+            sizes = numpy.frombuffer(self.size, numpy.intc)
+            lefts = numpy.frombuffer(self.x, numpy.float32).astype(numpy.int64) - sizes
+            tops = (numpy.frombuffer(self.y, numpy.float32).astype(numpy.float64)
+                    - numpy.frombuffer(self.speed, numpy.float32) * lag).astype(numpy.int64) - sizes
+            visible = tops < screen.get_height()
+            blits = zip([sprites.get(size) or sprite(size) for size in sizes[visible].tolist()],
+                        zip(lefts[visible].tolist(), tops[visible].tolist()))
+        else:
+            blits = [(sprites.get(size) or sprite(size), (int(x) - size, int(y - speed * lag) - size))
+                     for x, y, size, speed in zip(self.x, self.y, self.size, self.speed)]
+        return screen.blits(blits, doreturn=return_rects)
+
+
+class DodgeGame:
+    def __init__(self, starfield=None, spawn_rate=0.5, spawn_count=1, rng=None):
+        self.starfield = starfield or StarField()
+        self.rng = rng or random.Random()
+        self.last_dirty_rects = None
         self.player_x = SCREEN_WIDTH // 2
         self.player_y = SCREEN_HEIGHT - 100
+        self.prev_player_x = self.player_x
         self.player_size = 25
-        self.speed = 7
-        self.asteroids = []
-        self.spawn_timer = 0
-        self.spawn_rate = 30
-        self.time_survived = 0
+        self.speed = 420  # pixels per second
+        self.asteroids = AsteroidField()
+        self.spawn_timer = 0.0
+        self.spawn_rate = spawn_rate  # seconds between spawns
+        self.spawn_count = spawn_count  # asteroids per spawn, raised for storm levels
+        self.time_survived = 0.0
         self.finished = False
         self.won = False
-        self.duration = 1800  # 30 seconds at 60 FPS
+        self.duration = 30.0  # seconds
 
     def handle_event(self, event):
         pass
 
-    def update(self):
+    # Plain attributes copied by snapshot(); the asteroid columns are saved as raw bytes
+    SNAPSHOT_FIELDS = ("player_x", "prev_player_x", "spawn_timer", "spawn_rate", "spawn_count",
+                       "time_survived", "finished", "won", "duration")
+
+    def snapshot(self):
+        data = {name: getattr(self, name) for name in self.SNAPSHOT_FIELDS}
+        asteroids = self.asteroids
+        data["asteroids"] = tuple(column.tobytes() for column in
+                                  (asteroids.x, asteroids.y, asteroids.size, asteroids.speed))
+        data["rng"] = self.rng.getstate()
+        return data
+
+    @classmethod
+    def from_snapshot(cls, starfield, data):
+        dodge = cls(starfield)
+        for name in cls.SNAPSHOT_FIELDS:
+            setattr(dodge, name, data[name])
+        for column, raw in zip((dodge.asteroids.x, dodge.asteroids.y, dodge.asteroids.size,
+                                dodge.asteroids.speed), data["asteroids"]):
+            column.frombytes(raw)
+        dodge.rng.setstate(data["rng"])
+        return dodge
+
+    def update(self, dt, keys):
         if self.finished:
             return
 
         # Move player
-        keys = pygame.key.get_pressed()
+        self.prev_player_x = self.player_x
         if keys[pygame.K_LEFT]:
-            self.player_x -= self.speed
+            self.player_x -= self.speed * dt
         if keys[pygame.K_RIGHT]:
-            self.player_x += self.speed
+            self.player_x += self.speed * dt
 
         self.player_x = max(self.player_size, min(SCREEN_WIDTH - self.player_size, self.player_x))
 
         # Spawn asteroids
-        self.spawn_timer += 1
+        self.spawn_timer += dt
         if self.spawn_timer >= self.spawn_rate:
-            self.spawn_timer = 0
-            x = random.randint(20, SCREEN_WIDTH - 20)
-            size = random.randint(15, 35)
-            speed = random.uniform(3, 7)
-            self.asteroids.append({"x": x, "y": -20, "size": size, "speed": speed})
-
-        # Update asteroids
-        for asteroid in self.asteroids[:]:
-            asteroid["y"] += asteroid["speed"]
-
-            # Check collision with player
-            distance = math.sqrt((asteroid["x"] - self.player_x) ** 2 +
-                               (asteroid["y"] - self.player_y) ** 2)
-            if distance < asteroid["size"] + self.player_size:
-                self.finished = True
-                self.won = False
-                return
-
-            # Remove off-screen asteroids
-            if asteroid["y"] > SCREEN_HEIGHT + 50:
-                self.asteroids.remove(asteroid)
+            self.spawn_timer -= self.spawn_rate
+            for _ in range(self.spawn_count):
+                x = self.rng.randint(20, SCREEN_WIDTH - 20)
+                size = self.rng.randint(15, 35)
+                speed = self.rng.uniform(180, 420)  # pixels per second
+                self.asteroids.spawn(x, -20, size, speed)
+
+        # Update asteroids, removing off-screen ones and checking the player
+        if self.asteroids.update(dt, self.player_x, self.player_y, self.player_size, SCREEN_HEIGHT + 50):
+            self.finished = True
+            self.won = False
+            return
 
         # Check win condition
-        self.time_survived += 1
+        self.time_survived += dt
         if self.time_survived >= self.duration:
             self.finished = True
             self.won = True
 
-    def draw(self, screen, font_medium, font_small):
-        screen.fill(SPACE_BLUE)
+    def draw(self, screen, font_medium, font_small, alpha=1.0):
+        """Draw the round; returns the changed rects, or None for the whole screen.
 
-        # Draw stars
-        for i in range(100):
-            x = (i * 137) % SCREEN_WIDTH
-            y = (i * 219 + self.time_survived) % SCREEN_HEIGHT
-            size = (i % 3) + 1
-            pygame.draw.circle(screen, WHITE, (x, y), size)
+        alpha is how far into the next simulation step this frame is drawn;
+        moving things are drawn interpolated to that point.
+        """
+        lag = 0.0 if self.finished else (1.0 - alpha) * SIM_DT
+        player_x = self.prev_player_x + (self.player_x - self.prev_player_x) * alpha
+
+        # Scrolling star layer
+        star_offset = int(max(0.0, self.time_survived - lag) * STAR_SCROLL_SPEED)
+        self.starfield.draw(screen, star_offset)
 
         if not self.finished:
+            dirty = self.starfield.star_rects(star_offset)
+
             # Draw player
-            pygame.draw.circle(screen, WHITE, (int(self.player_x), int(self.player_y)),
+            pygame.draw.circle(screen, WHITE, (int(player_x), int(self.player_y)),
                              self.player_size)
             pygame.draw.circle(screen, SPACE_BLUE,
-                             (int(self.player_x - 8), int(self.player_y - 5)), 4)
+                             (int(player_x - 8), int(self.player_y - 5)), 4)
             pygame.draw.circle(screen, SPACE_BLUE,
-                             (int(self.player_x + 8), int(self.player_y - 5)), 4)
+                             (int(player_x + 8), int(self.player_y - 5)), 4)
+
+            dirty.append(pygame.Rect(int(player_x) - self.player_size,
+                                     int(self.player_y) - self.player_size,
+                                     self.player_size * 2 + 1, self.player_size * 2 + 1))
 
-            # Draw asteroids
-            for asteroid in self.asteroids:
-                pygame.draw.circle(screen, (139, 69, 19),
-                                 (int(asteroid["x"]), int(asteroid["y"])),
-                                 asteroid["size"])
-                pygame.draw.circle(screen, (101, 67, 33),
-                                 (int(asteroid["x"]), int(asteroid["y"])),
-                                 asteroid["size"], 3)
+            # Draw asteroids; with too many to track the whole screen is updated
+            if len(self.asteroids) * 2 < MAX_DIRTY_RECTS:
+                dirty.extend(self.asteroids.draw(screen, lag=lag))
+            else:
+                self.asteroids.draw(screen, return_rects=False, lag=lag)
+                dirty = None
 
             # Timer
-            time_left = (self.duration - self.time_survived) // 60
-            timer_text = font_medium.render(f"Timp: {time_left}s", True, YELLOW)
-            screen.blit(timer_text, (SCREEN_WIDTH // 2 - timer_text.get_width() // 2, 20))
+            time_left = int(self.duration - self.time_survived)
+            timer_text = font_medium.render(f"Timp: {time_left}s", True, YELLOW, volatile=True)
+            timer_pos = (SCREEN_WIDTH // 2 - timer_text.get_width() // 2, 20)
+            screen.blit(timer_text, timer_pos)
+            if dirty is not None:
+                dirty.append(timer_text.get_rect(topleft=timer_pos))
 
             # Instructions
             inst = font_small.render("Foloseste sagetile STANGA/DREAPTA pentru a evita!", True, WHITE)
             screen.blit(inst, (SCREEN_WIDTH // 2 - inst.get_width() // 2, 70))
+
+            # What was drawn last frame must be cleared as well
+            changed = None
+            if dirty is not None:
+                changed = dirty + (self.last_dirty_rects or [])
+                if len(changed) > MAX_DIRTY_RECTS:
+                    changed = None
+            self.last_dirty_rects = dirty
+            return changed
         else:
             if self.won:
                 result = font_medium.render("FELICITARI!", True, GREEN)
@@ -706,60 +2799,166 @@ class DodgeGame:
             cont = font_small.render("Apasa orice tasta pentru a continua...", True, YELLOW)
             screen.blit(cont, (SCREEN_WIDTH // 2 - cont.get_width() // 2,
                              SCREEN_HEIGHT // 2 + 100))
+            return None
+
+
+def discover_slides(folder=SLIDES_DIR):
+    """List the slide images in folder, ordered so that 2.png comes before 10.png"""
+    def natural_key(name):
+        return [int(part) if part.isdigit() else part.lower()
+                for part in re.split(r'(\d+)', name)]
+
+    try:
+        names = [name for name in os.listdir(folder) if name.lower().endswith(SLIDE_EXTENSIONS)]
+    except OSError as e:
+        print(f"Error listing slides in {folder}: {e}")
+        return []
+    return [os.path.join(folder, name) for name in sorted(names, key=natural_key)]
+
+
+def decode_slide(path, box, cache_dir=SLIDE_CACHE_DIR):
+    """Decode and scale one slide to fit box; returns (size, raw RGB buffer).
+
+    Scaled pixels are cached on disk in one file per source, memory-mapped
+    on later loads; the file is rewritten when the source or box changes.
+    """
+    load_pil()
+    stat = os.stat(path)
+    cache_path = os.path.join(cache_dir, hashlib.sha1(os.path.abspath(path).encode()).hexdigest() + ".rgb")
+    try:
+        with open(cache_path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mtime, box_width, box_height, width, height = SLIDE_CACHE_HEADER.unpack_from(data)
+        if ((mtime, box_width, box_height) == (stat.st_mtime_ns, box[0], box[1])
+                and len(data) == SLIDE_CACHE_HEADER.size + width * height * 3):
+            return (width, height), memoryview(data)[SLIDE_CACHE_HEADER.size:]
+        data.close()
+    except (OSError, ValueError, struct.error):
+        pass
+
+    pil_image = Image.open(path)
+    # JPEGs can be decoded at a fraction of their size when they are much bigger than the box
+    pil_image.draft('RGB', box)
+    ALLOCATIONS["pil_image"] += 1
+
+    # Scale image to fit the box while maintaining aspect ratio
+    img_width, img_height = pil_image.size
+    scale_factor = min(box[0] / img_width, box[1] / img_height)
+    new_width = int(img_width * scale_factor)
+    new_height = int(img_height * scale_factor)
+    if pil_image.mode not in ('RGB', 'RGBA'):
+        pil_image = pil_image.convert('RGBA' if 'transparency' in pil_image.info else 'RGB')
+    pil_image = pil_image.resize((new_width, new_height), Image.LANCZOS)
+
+    # Flatten transparency onto white after scaling, on the smaller image
+    if pil_image.mode == 'RGBA':
+        background = Image.new('RGB', pil_image.size, (255, 255, 255))
+        background.paste(pil_image, mask=pil_image.getchannel('A'))
+        pil_image = background
+    data = pil_image.tobytes()
+    ALLOCATIONS["buffer"] += 1
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(SLIDE_CACHE_HEADER.pack(stat.st_mtime_ns, box[0], box[1], new_width, new_height))
+            f.write(data)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"Could not cache slide {path}: {e}")
+
+    return (new_width, new_height), data
+
+
+class SlideLoader:
+    """Loads slides in a background thread pool and keeps the decoded surfaces.
+
+    A SLIDE_LOADED event is posted whenever a slide finishes, so the game loop
+    can sleep while waiting for it.
+    """
+    def __init__(self, box=SLIDE_BOX, workers=2):
+        self.box = box
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.futures = {}
+        self.surfaces = {}
+
+    def _decode(self, path):
+        try:
+            return decode_slide(path, self.box)
+        finally:
+            if pygame.display.get_init():
+                pygame.event.post(pygame.event.Event(SLIDE_LOADED, path=path))
+
+    def request(self, path):
+        """Start loading a slide unless it is already loaded or loading"""
+        if path not in self.surfaces and path not in self.futures:
+            self.futures[path] = self.executor.submit(self._decode, path)
+
+    def get(self, path):
+        """Return the slide surface, or None while it is still loading"""
+        surface = self.surfaces.get(path)
+        if surface is not None:
+            return surface
+
+        self.request(path)
+        future = self.futures[path]
+        if not future.done():
+            return None
+
+        del self.futures[path]
+        try:
+            size, data = future.result()
+            surface = pygame.image.frombuffer(data, size, 'RGB')
+        except Exception as e:
+            print(f"Error loading image {path}: {e}")
+            # Create placeholder if image fails to load
+            surface = pygame.Surface((600, 400))
+            ALLOCATIONS["surface"] += 1
+            surface.fill((100, 100, 100))
+        self.surfaces[path] = surface
+        return surface
+
+    def retain(self, paths):
+        """Drop decoded and pending slides that are not in paths"""
+        keep = set(paths)
+        for path in [p for p in self.surfaces if p not in keep]:
+            del self.surfaces[path]
+        for path in [p for p in self.futures if p not in keep]:
+            # Running decodes finish and are simply discarded
+            self.futures.pop(path).cancel()
 
 
 class Slideshow:
-    def __init__(self):
+    PREV_BUTTON = pygame.Rect(50, SCREEN_HEIGHT - 80, 150, 60)
+    NEXT_BUTTON = pygame.Rect(SCREEN_WIDTH - 200, SCREEN_HEIGHT - 80, 150, 60)
+
+    def __init__(self, loader):
         self.current_slide = 0
         self.closed = False
-        self.images = []
-
-        # Load images from pics/ folder using PIL/Pillow
-        for i in range(1, 5):
-            try:
-                # Load image using PIL
-                pil_image = Image.open(f"pics/{i}.png")
-                print(f"Loaded image {i} with PIL: {pil_image.size}")
-
-                # Convert PIL image to RGB mode (remove alpha channel if present)
-                if pil_image.mode == 'RGBA':
-                    # Create white background
-                    background = Image.new('RGB', pil_image.size, (255, 255, 255))
-                    background.paste(pil_image, mask=pil_image.split()[3])  # Use alpha channel as mask
-                    pil_image = background
-                elif pil_image.mode != 'RGB':
-                    pil_image = pil_image.convert('RGB')
-
-                # Scale image to fit screen while maintaining aspect ratio
-                img_width, img_height = pil_image.size
-                scale_factor = min((SCREEN_WIDTH - 200) / img_width,
-                                 (SCREEN_HEIGHT - 200) / img_height)
-                new_width = int(img_width * scale_factor)
-                new_height = int(img_height * scale_factor)
-                pil_image = pil_image.resize((new_width, new_height), Image.LANCZOS)
-
-                # Convert PIL image to pygame surface
-                mode = pil_image.mode
-                size = pil_image.size
-                data = pil_image.tobytes()
-                img = pygame.image.fromstring(data, size, mode)
-
-                self.images.append(img)
-                print(f"Converted image {i} to pygame surface: {new_width}x{new_height}")
-            except Exception as e:
-                print(f"Error loading image {i}: {e}")
-                import traceback
-                traceback.print_exc()
-                # Create placeholder if image fails to load
-                placeholder = pygame.Surface((600, 400))
-                placeholder.fill((100, 100, 100))
-                self.images.append(placeholder)
-
-        print(f"Total images loaded: {len(self.images)}")
+        self.loader = loader
+        self.paths = discover_slides()
+        self.show_slide(0)
+
+    def show_slide(self, index):
+        """Switch slides, keeping only a window of decoded slides around the current one"""
+        self.current_slide = index
+        start = max(0, index - SLIDE_WINDOW)
+        window = self.paths[start:index + SLIDE_WINDOW + 1]
+        self.loader.retain(window)
+
+        # Current slide first, then prefetch outwards: next, previous, ...
+        if self.paths:
+            self.loader.request(self.paths[index])
+        for distance in range(1, SLIDE_WINDOW + 1):
+            if index + distance < len(self.paths):
+                self.loader.request(self.paths[index + distance])
+            if index - distance >= 0:
+                self.loader.request(self.paths[index - distance])
 
     def handle_event(self, event):
         if event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_pos = pygame.mouse.get_pos()
+            mouse_pos = event.pos
 
             # Check X button (top right)
             x_button_rect = pygame.Rect(SCREEN_WIDTH - 60, 10, 50, 50)
@@ -769,29 +2968,37 @@ class Slideshow:
 
             # Check Previous button
             if self.current_slide > 0:
-                prev_button_rect = pygame.Rect(50, SCREEN_HEIGHT - 80, 150, 60)
+                prev_button_rect = self.PREV_BUTTON
                 if prev_button_rect.collidepoint(mouse_pos):
-                    self.current_slide -= 1
+                    self.show_slide(self.current_slide - 1)
                     return
 
             # Check Next button
-            if self.current_slide < len(self.images) - 1:
-                next_button_rect = pygame.Rect(SCREEN_WIDTH - 200, SCREEN_HEIGHT - 80, 150, 60)
+            if self.current_slide < len(self.paths) - 1:
+                next_button_rect = self.NEXT_BUTTON
                 if next_button_rect.collidepoint(mouse_pos):
-                    self.current_slide += 1
+                    self.show_slide(self.current_slide + 1)
                     return
 
     def draw(self, screen, font_medium, font_small):
         screen.fill(SPACE_BLUE)
 
         # Draw current image
-        if self.current_slide < len(self.images) and self.images:
-            img = self.images[self.current_slide]
-            img_rect = img.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
-            screen.blit(img, img_rect)
+        if self.current_slide < len(self.paths):
+            img = self.loader.get(self.paths[self.current_slide])
+            if img is not None:
+                img_rect = img.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
+                screen.blit(img, img_rect)
+            else:
+                # Placeholder while the slide is decoded in the background
+                placeholder_rect = pygame.Rect(0, 0, SLIDE_BOX[0], SLIDE_BOX[1])
+                placeholder_rect.center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+                pygame.draw.rect(screen, (30, 30, 60), placeholder_rect, border_radius=10)
+                loading_text = font_small.render("Se incarca...", True, WHITE)
+                screen.blit(loading_text, loading_text.get_rect(center=placeholder_rect.center))
         else:
             # Debug: show if no images
-            debug_text = font_small.render(f"No images loaded ({len(self.images)} total)", True, RED)
+            debug_text = font_small.render(f"No images loaded ({len(self.paths)} total)", True, RED)
             screen.blit(debug_text, (SCREEN_WIDTH // 2 - debug_text.get_width() // 2, SCREEN_HEIGHT // 2))
 
         # Draw X button (top right)
@@ -803,63 +3010,662 @@ class Slideshow:
 
         # Draw Previous button
         if self.current_slide > 0:
-            prev_button_rect = pygame.Rect(50, SCREEN_HEIGHT - 80, 150, 60)
+            prev_button_rect = self.PREV_BUTTON
             pygame.draw.rect(screen, GREEN, prev_button_rect, border_radius=10)
             prev_text = font_small.render("< Inapoi", True, BLACK)
             prev_text_rect = prev_text.get_rect(center=prev_button_rect.center)
             screen.blit(prev_text, prev_text_rect)
 
         # Draw Next button
-        if self.current_slide < len(self.images) - 1:
-            next_button_rect = pygame.Rect(SCREEN_WIDTH - 200, SCREEN_HEIGHT - 80, 150, 60)
+        if self.current_slide < len(self.paths) - 1:
+            next_button_rect = self.NEXT_BUTTON
             pygame.draw.rect(screen, GREEN, next_button_rect, border_radius=10)
             next_text = font_small.render("Inainte >", True, BLACK)
             next_text_rect = next_text.get_rect(center=next_button_rect.center)
             screen.blit(next_text, next_text_rect)
 
         # Draw slide counter
-        counter_text = font_small.render(f"{self.current_slide + 1} / {len(self.images)}", True, YELLOW)
+        counter_text = font_small.render(f"{self.current_slide + 1} / {len(self.paths)}", True, YELLOW, volatile=True)
         screen.blit(counter_text, (SCREEN_WIDTH // 2 - counter_text.get_width() // 2, 20))
 
 
-class Notes:
+def fold_text(text):
+    """Lowercase text and strip diacritics, so Pământ matches pamant"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+class NoteSearchIndex:
+    """Incremental inverted index over notes with diacritic folding.
+
+    Terms are kept sorted so every query word is matched as a prefix with
+    a bisect, which lets results update while the user is still typing.
+    """
     def __init__(self):
-        self.closed = False
-        self.notes_file = "student_notes.json"
-        self.notes = self.load_notes()
-        self.current_note = ""
-        self.input_active = False
-        self.scroll_offset = 0
-        self.max_note_length = 200
+        self.postings = {}   # term -> ascending note indexes
+        self.terms = []      # sorted terms for prefix lookups
+        self.count = 0       # number of notes indexed
+        self.last = None     # text of the last indexed note
+        self.dirty = False
+
+    @staticmethod
+    def tokenize(text):
+        return re.findall(r'\w+', fold_text(text))
+
+    def add(self, index, text):
+        for term in set(self.tokenize(text)):
+            ids = self.postings.get(term)
+            if ids is None:
+                self.postings[term] = [index]
+                bisect.insort(self.terms, term)
+            else:
+                ids.append(index)
+        self.count = index + 1
+        self.last = text
+        self.dirty = True
+
+    def sync(self, notes):
+        """Index notes added since the last save, rebuilding if they do not match"""
+        if self.count > len(notes) or (self.count and notes[self.count - 1] != self.last):
+            self.postings.clear()
+            self.terms.clear()
+            self.count = 0
+        for index in range(self.count, len(notes)):
+            self.add(index, notes[index])
+
+    def search(self, query):
+        """Indexes of notes containing a word starting with every query word"""
+        result = None
+        for word in self.tokenize(query):
+            start = bisect.bisect_left(self.terms, word)
+            end = bisect.bisect_left(self.terms, word + '\uffff')
+            matches = set()
+            for term in self.terms[start:end]:
+                matches.update(self.postings[term])
+            result = matches if result is None else result & matches
+            if not result:
+                return []
+        return sorted(result) if result is not None else []
+
+    def load(self, path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.postings = data["postings"]
+            self.terms = sorted(self.postings)
+            self.count = data["count"]
+            self.last = data["last"]
+        except (OSError, ValueError, KeyError):
+            # The index is derived data, sync() rebuilds it from the notes
+            self.postings, self.terms, self.count, self.last = {}, [], 0, None
+
+    def save(self, path):
+        if not self.dirty:
+            return
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"count": self.count, "last": self.last, "postings": self.postings},
+                          f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            self.dirty = False
+        except OSError as e:
+            print(f"Error saving notes index: {e}")
+
+
+class NoteStore:
+    """Notes kept as a JSON snapshot plus an append-only JSON-lines journal.
+
+    Adding a note appends one fsync'd line to the journal instead of rewriting
+    the snapshot. Every journal record carries the index of its note, so a
+    replay after a crash during compaction never duplicates notes. The
+    snapshot keeps the original student_notes.json format.
+    """
+    def __init__(self, snapshot_file, compact_every=100):
+        self.snapshot_file = snapshot_file
+        self.journal_file = os.path.splitext(snapshot_file)[0] + ".jsonl"
+        self.index_file = os.path.splitext(snapshot_file)[0] + ".index.json"
+        self.compact_every = compact_every
+        self.notes = None
+        self.index = None
+        self.journal_records = 0
 
-    def load_notes(self):
-        """Load notes from JSON file"""
-        if os.path.exists(self.notes_file):
+    def load(self):
+        """Return the notes list, reading the files only on first use"""
+        if self.notes is not None:
+            return self.notes
+
+        self.notes = []
+        if os.path.exists(self.snapshot_file):
             try:
-                with open(self.notes_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except:
-                return []
-        return []
+                with open(self.snapshot_file, 'r', encoding='utf-8') as f:
+                    self.notes = json.load(f)
+            except (OSError, ValueError) as e:
+                # Keep the unreadable file around instead of compacting over it
+                print(f"Error loading notes: {e}")
+                try:
+                    os.replace(self.snapshot_file, self.snapshot_file + ".corrupt")
+                except OSError:
+                    pass
+
+        self.replay_journal()
+        return self.notes
+
+    def replay_journal(self):
+        """Apply journal records newer than the snapshot, dropping a torn last record"""
+        if not os.path.exists(self.journal_file):
+            return
+
+        with open(self.journal_file, 'rb') as f:
+            lines = f.read().split(b"\n")
 
-    def save_notes(self):
-        """Save notes to JSON file"""
+        good_size = 0
+        for i, line in enumerate(lines):
+            last = i == len(lines) - 1
+            if not line:
+                if not last:
+                    good_size += 1
+                continue
+            try:
+                record = json.loads(line.decode('utf-8'))
+                seq, text = record["seq"], record["text"]
+            except (ValueError, KeyError, TypeError):
+                if last:
+                    # Power was cut mid-append: cut the partial record off
+                    print(f"Dropping torn note record in {self.journal_file}")
+                    with open(self.journal_file, 'r+b') as f:
+                        f.truncate(good_size)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    break
+                print(f"Skipping corrupt note record {i + 1} in {self.journal_file}")
+                good_size += len(line) + 1
+                continue
+
+            good_size += len(line) + 1
+            self.journal_records += 1
+            # Records already folded into the snapshot are skipped
+            if seq >= len(self.notes):
+                self.notes.append(text)
+
+            if last:
+                # Complete record without its newline: finish it before appending more
+                with open(self.journal_file, 'ab') as f:
+                    f.write(b"\n")
+
+    def search_index(self):
+        """Return the search index, loading it and catching up on first use"""
+        if self.index is None:
+            self.index = NoteSearchIndex()
+            self.index.load(self.index_file)
+            self.index.sync(self.load())
+        return self.index
+
+    def ensure_folder(self):
+        folder = os.path.dirname(self.snapshot_file)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+
+    def save_index(self):
+        if self.index is not None:
+            try:
+                self.ensure_folder()
+            except OSError as e:
+                print(f"Error saving notes index: {e}")
+                return
+            self.index.save(self.index_file)
+
+    def append(self, text):
+        """Add a note durably: one journal line, flushed and fsync'd"""
+        notes = self.load()
+        record = {"seq": len(notes), "text": text}
+        notes.append(text)
+        if self.index is not None:
+            self.index.add(record["seq"], text)
         try:
-            with open(self.notes_file, 'w', encoding='utf-8') as f:
-                json.dump(self.notes, f, ensure_ascii=False, indent=2)
-        except Exception as e:
+            self.ensure_folder()
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as e:
             print(f"Error saving notes: {e}")
+            return
+
+        self.journal_records += 1
+        if self.journal_records >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Atomically rewrite the snapshot with all notes, then empty the journal"""
+        notes = self.load()
+        tmp_file = self.snapshot_file + ".tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(notes, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.snapshot_file)
+            with open(self.journal_file, 'w', encoding='utf-8') as f:
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_records = 0
+        except OSError as e:
+            print(f"Error compacting notes: {e}")
+        self.save_index()
+
+
+class ProgressStore:
+    """Visited planets, quiz answers, question decks and dodge results of every student profile.
+
+    Progress is kept in SQLite in WAL mode. Writes are queued and committed
+    by a background thread, several per transaction, so the game loop never
+    waits on the disk; reads happen once per profile, when it is first used,
+    on one connection kept open for them. A read first asks the writer to
+    commit what is queued right away instead of waiting for the batch.
+    """
+    FLUSH = "flush"  # queued by flush(): commit the batch now
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS visits (profile TEXT, planet TEXT, time REAL, PRIMARY KEY (profile, planet))",
+        "CREATE TABLE IF NOT EXISTS answers (profile TEXT, planet TEXT, question TEXT, correct INTEGER, time REAL)",
+        "CREATE TABLE IF NOT EXISTS dodge_results (profile TEXT, planet TEXT, survived REAL, won INTEGER, time REAL)",
+        "CREATE INDEX IF NOT EXISTS answers_profile ON answers (profile, planet)",
+        "CREATE TABLE IF NOT EXISTS profiles (name TEXT PRIMARY KEY, created REAL)",
+        "CREATE TABLE IF NOT EXISTS decks (profile TEXT, planet TEXT, state TEXT, PRIMARY KEY (profile, planet))",
+    )
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.queue = queue.Queue()
+        self.writer = None
+        self.reader = None  # connection of the game thread, opened by the first read
+        self.visited = {}  # profile -> set of planet ids
+
+    def connect(self):
+        """Open a connection, creating the tables if the file is new"""
+        connection = sqlite3.connect(self.db_file)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in self.SCHEMA:
+            connection.execute(statement)
+        connection.commit()
+        return connection
+
+    def read(self, sql, params=()):
+        """Rows of a query, after the queued writes are committed"""
+        self.flush()
+        if self.reader is None:
+            self.reader = self.connect()
+        return self.reader.execute(sql, params).fetchall()
+
+    def visited_planets(self, profile):
+        """Set of planet ids the profile has completed, read on first use"""
+        if profile not in self.visited:
+            planets = set()
+            try:
+                rows = self.read("SELECT planet FROM visits WHERE profile = ?", (profile,))
+                planets = {planet for (planet,) in rows}
+            except sqlite3.Error as e:
+                print(f"Error loading progress: {e}")
+            self.visited[profile] = planets
+        return self.visited[profile]
+
+    def deck_state(self, profile, planet):
+        """Saved QuestionDeck snapshot of a profile and planet, or None"""
+        try:
+            rows = self.read("SELECT state FROM decks WHERE profile = ? AND planet = ?", (profile, planet))
+            return json.loads(rows[0][0]) if rows else None
+        except (sqlite3.Error, ValueError) as e:
+            print(f"Error loading question deck: {e}")
+            return None
+
+    def save_deck(self, profile, planet, state):
+        self.write("INSERT OR REPLACE INTO decks VALUES (?, ?, ?)", (profile, planet, json.dumps(state)))
+
+    def saved_state(self):
+        """Visits and decks of every profile, which decide how a recorded session plays"""
+        try:
+            return {"visits": self.read("SELECT profile, planet FROM visits"),
+                    "decks": self.read("SELECT profile, planet, state FROM decks")}
+        except sqlite3.Error as e:
+            print(f"Error loading progress: {e}")
+            return {"visits": [], "decks": []}
+
+    def load_saved_state(self, state):
+        """Start from the saved_state() of another store (used by replays)"""
+        for profile, planet in state["visits"]:
+            self.record_visit(profile, planet)
+        for profile, planet, deck in state["decks"]:
+            self.write("INSERT OR REPLACE INTO decks VALUES (?, ?, ?)", (profile, planet, deck))
+
+    def profile_names(self):
+        """Names of all profiles in the order they were created"""
+        try:
+            return [name for (name,) in self.read("SELECT name FROM profiles ORDER BY created")]
+        except sqlite3.Error as e:
+            print(f"Error loading profiles: {e}")
+            return []
+
+    def add_profile(self, profile):
+        self.visited[profile] = set()
+        self.write("INSERT OR IGNORE INTO profiles VALUES (?, ?)", (profile, time.time()))
+
+    def write(self, sql, params):
+        if self.writer is None:
+            self.writer = threading.Thread(target=self.write_loop, daemon=True)
+            self.writer.start()
+        self.queue.put((sql, params))
+
+    def write_loop(self):
+        try:
+            connection = self.connect()
+        except sqlite3.Error as e:
+            print(f"Error opening progress store: {e}")
+            connection = None
+
+        stop = False
+        while not stop:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + PROGRESS_BATCH_DELAY
+            # A flush request or the stop marker ends the batch at once
+            while isinstance(batch[-1], tuple) and len(batch) < PROGRESS_BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+
+            writes = [item for item in batch if isinstance(item, tuple)]
+            if writes and connection is not None:
+                try:
+                    with connection:
+                        for sql, params in writes:
+                            connection.execute(sql, params)
+                except sqlite3.Error as e:
+                    print(f"Error saving progress: {e}")
+            for _ in batch:
+                self.queue.task_done()
+
+        if connection is not None:
+            connection.close()
+
+    def record_visit(self, profile, planet):
+        if profile in self.visited:
+            self.visited[profile].add(planet)
+        self.write("INSERT OR IGNORE INTO visits VALUES (?, ?, ?)", (profile, planet, time.time()))
+
+    def record_answer(self, profile, planet, question, correct):
+        self.write("INSERT INTO answers VALUES (?, ?, ?, ?, ?)",
+                   (profile, planet, question, int(correct), time.time()))
+
+    def record_dodge(self, profile, planet, survived, won):
+        self.write("INSERT INTO dodge_results VALUES (?, ?, ?, ?, ?)",
+                   (profile, planet, survived, int(won), time.time()))
+
+    def flush(self):
+        """Have the writer commit every queued write now, and wait for it"""
+        if self.writer is not None and self.queue.unfinished_tasks:
+            self.queue.put(self.FLUSH)
+            self.queue.join()
+
+    def close(self):
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+
+class HeightIndex:
+    """Prefix sums of row heights (a Fenwick tree).
+
+    Changing a row, the offset of a row and the row at a given offset all
+    take O(log n), however many rows there are.
+    """
+    def __init__(self, heights=()):
+        self.heights = list(heights)
+        self.tree = [0] + self.heights
+        n = len(self.heights)
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self.tree[parent] += self.tree[i]
+
+    def __len__(self):
+        return len(self.heights)
+
+    def total(self):
+        return self.offset(len(self.heights))
+
+    def offset(self, index):
+        """Sum of the heights of rows before index"""
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def set(self, index, height):
+        delta = height - self.heights[index]
+        if not delta:
+            return
+        self.heights[index] = height
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def append(self, height):
+        i = len(self.tree)
+        # The new node covers rows (i - lowbit(i), i]
+        self.tree.append(height + self.offset(i - 1) - self.offset(i - (i & -i)))
+        self.heights.append(height)
+
+    def find(self, y):
+        """Index of the row containing offset y (clamped to the last row)"""
+        index = 0
+        remaining = y
+        step = 1 << len(self.tree).bit_length()
+        while step:
+            nxt = index + step
+            if nxt < len(self.tree) and self.tree[nxt] <= remaining:
+                index = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        return min(index, len(self.heights) - 1)
+
+
+class NoteLayout:
+    """Word-wrapped lines of each note, measured once with font metrics.
+
+    Wrapped lines are cached per (note, width). Rendered line surfaces are
+    kept for the most recently drawn notes only, so a long list stays cheap
+    in memory while scrolling costs just blits.
+    """
+    def __init__(self, font, max_width, color=WHITE, max_rendered=64):
+        self.font = font
+        self.max_width = max_width
+        self.color = color
+        self.max_rendered = max_rendered
+        self.wrapped = {}
+        self.rendered = OrderedDict()
+        self.char_width = None
+
+    def set_width(self, max_width):
+        if max_width != self.max_width:
+            self.max_width = max_width
+            self.wrapped.clear()
+            self.rendered.clear()
+            self.char_width = None
+
+    def estimate_lines(self, note):
+        """Cheap line count guess for notes that have not been wrapped yet"""
+        lines = self.wrapped.get(note)
+        if lines is not None:
+            return len(lines)
+        if self.char_width is None:
+            sample = "Planeta are inele si multi sateliti"
+            self.char_width = self.font.measure(sample)[0] / len(sample)
+        return max(1, math.ceil(len(note) * self.char_width / self.max_width))
+
+    def lines(self, note):
+        lines = self.wrapped.get(note)
+        if lines is not None:
+            return lines
+
+        lines = []
+        current_line = ""
+        for word in note.split(' '):
+            test_line = current_line + " " + word if current_line else word
+            if self.font.measure(test_line)[0] <= self.max_width:
+                current_line = test_line
+            else:
+                if current_line:
+                    lines.append(current_line)
+                current_line = word
+        if current_line:
+            lines.append(current_line)
+
+        lines = tuple(lines)
+        self.wrapped[note] = lines
+        return lines
+
+    def surfaces(self, note):
+        """Rendered bullet lines of a note"""
+        surfaces = self.rendered.get(note)
+        if surfaces is not None:
+            self.rendered.move_to_end(note)
+            return surfaces
+
+        surfaces = [self.font.render(f"• {line}", True, self.color, keep=True) for line in self.lines(note)]
+        self.rendered[note] = surfaces
+        if len(self.rendered) > self.max_rendered:
+            self.rendered.popitem(last=False)
+        return surfaces
+
+
+class Notes:
+    def __init__(self, store):
+        self.closed = False
+        self.store = store
+        self.notes = store.load()
+        self.current_note = ""
+        self.input_active = False
+        self.max_note_length = 200
+        self.layout = None
+
+        # Virtualized list: pixel scroll position over a prefix-sum height index
+        self.notes_area = pygame.Rect(50, 90, SCREEN_WIDTH - 120, SCREEN_HEIGHT - 300)
+        self.heights = None
+        self.scroll_y = 0.0
+        self.velocity = 0.0
+        self.dragging = False
+        self.drag_y = 0
+        self.drag_time = 0
+
+        # Search box; rows holds the indexes of the notes being listed
+        self.search_rect = pygame.Rect(50, 25, 280, 50)
+        self.search_active = False
+        self.query = ""
+        self.rows = range(len(self.notes))
+
+    def add_note(self, text):
+        self.store.append(text)
+        if self.query.strip():
+            self.set_query(self.query)
+        elif self.heights is not None:
+            self.rows = range(len(self.notes))
+            self.heights.append(self.row_height(len(self.rows) - 1))
+            # Show the note that was just added
+            self.scroll_y = self.max_scroll()
+            self.velocity = 0.0
+        else:
+            self.rows = range(len(self.notes))
+
+    def set_query(self, query):
+        self.query = query
+        if query.strip():
+            self.rows = self.store.search_index().search(query)
+        else:
+            self.rows = range(len(self.notes))
+        self.heights = None
+        self.scroll_y = 0.0
+        self.velocity = 0.0
+
+    def close(self):
+        self.closed = True
+        self.store.save_index()
+
+    def row_height(self, row, measured=False):
+        note = self.notes[self.rows[row]]
+        lines = len(self.layout.lines(note)) if measured else self.layout.estimate_lines(note)
+        return lines * NOTE_LINE_HEIGHT + NOTE_SPACING
+
+    def max_scroll(self):
+        if self.heights is None:
+            return 0
+        return max(0, self.heights.total() + 40 - self.notes_area.height)
+
+    def scroll_to(self, y):
+        clamped = max(0, min(self.max_scroll(), y))
+        if clamped != y:
+            self.velocity = 0.0
+        self.scroll_y = clamped
+
+    def is_scrolling(self):
+        return self.dragging or abs(self.velocity) > 0
+
+    def update(self, dt):
+        """Inertial scrolling after a flick or mouse wheel"""
+        if self.dragging or not self.velocity:
+            return
+        self.scroll_to(self.scroll_y + self.velocity * dt)
+        self.velocity *= math.exp(-SCROLL_FRICTION * dt)
+        if abs(self.velocity) < 5:
+            self.velocity = 0.0
 
     def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_pos = pygame.mouse.get_pos()
+        if event.type == pygame.MOUSEWHEEL:
+            self.velocity -= event.y * SCROLL_WHEEL_SPEED
+
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            now = int(time.monotonic() * 1000)
+            dy = event.pos[1] - self.drag_y
+            self.scroll_to(self.scroll_y - dy)
+            if now > self.drag_time:
+                self.velocity = -dy * 1000 / (now - self.drag_time)
+            self.drag_y = event.pos[1]
+            self.drag_time = now
+
+        elif event.type == pygame.MOUSEBUTTONUP and self.dragging:
+            self.dragging = False
+            # A finger that stopped before lifting should not fling the list
+            if int(time.monotonic() * 1000) - self.drag_time > 100:
+                self.velocity = 0.0
+
+        # Buttons 4 and 5 are the legacy mouse wheel events
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button not in (4, 5):
+            mouse_pos = event.pos
 
             # Check X button (top right)
             x_button_rect = pygame.Rect(SCREEN_WIDTH - 60, 10, 50, 50)
             if x_button_rect.collidepoint(mouse_pos):
-                self.closed = True
+                self.close()
                 return
 
+            # Check search box
+            self.search_active = self.search_rect.collidepoint(mouse_pos)
+
+            # Touch drag on the notes list
+            if self.notes_area.collidepoint(mouse_pos):
+                self.dragging = True
+                self.velocity = 0.0
+                self.drag_y = mouse_pos[1]
+                self.drag_time = int(time.monotonic() * 1000)
+
             # Check if clicking on input box
             input_rect = pygame.Rect(50, SCREEN_HEIGHT - 180, SCREEN_WIDTH - 100, 100)
             if input_rect.collidepoint(mouse_pos):
@@ -871,31 +3677,44 @@ class Notes:
             if self.input_active or self.current_note:
                 add_button_rect = pygame.Rect(SCREEN_WIDTH - 200, SCREEN_HEIGHT - 70, 150, 50)
                 if add_button_rect.collidepoint(mouse_pos) and self.current_note.strip():
-                    self.notes.append(self.current_note.strip())
-                    self.save_notes()
+                    self.add_note(self.current_note.strip())
                     self.current_note = ""
                     self.input_active = False
 
             # Check scroll buttons
-            if len(self.notes) > 5:
+            if self.max_scroll() > 0:
                 # Scroll up
-                if self.scroll_offset > 0:
+                if self.scroll_y > 0:
                     scroll_up_rect = pygame.Rect(SCREEN_WIDTH - 60, 100, 40, 40)
                     if scroll_up_rect.collidepoint(mouse_pos):
-                        self.scroll_offset -= 1
+                        self.velocity = -SCROLL_WHEEL_SPEED
 
                 # Scroll down
-                if self.scroll_offset < len(self.notes) - 5:
+                if self.scroll_y < self.max_scroll():
                     scroll_down_rect = pygame.Rect(SCREEN_WIDTH - 60, SCREEN_HEIGHT - 250, 40, 40)
                     if scroll_down_rect.collidepoint(mouse_pos):
-                        self.scroll_offset += 1
+                        self.velocity = SCROLL_WHEEL_SPEED
+
+        elif event.type == pygame.KEYDOWN and self.search_active:
+            query = self.query
+            if event.key == pygame.K_BACKSPACE:
+                query = query[:-1]
+            elif event.key == pygame.K_ESCAPE:
+                query = ""
+                self.search_active = False
+            elif event.key == pygame.K_RETURN:
+                self.search_active = False
+            elif event.unicode and event.unicode.isprintable() and len(query) < 50:
+                query += event.unicode
+            # Arrows, Shift and the like leave the results (and the scroll) alone
+            if query != self.query:
+                self.set_query(query)
 
         elif event.type == pygame.KEYDOWN and self.input_active:
             if event.key == pygame.K_RETURN:
                 # Add note on Enter
                 if self.current_note.strip():
-                    self.notes.append(self.current_note.strip())
-                    self.save_notes()
+                    self.add_note(self.current_note.strip())
                     self.current_note = ""
                     self.input_active = False
             elif event.key == pygame.K_BACKSPACE:
@@ -905,7 +3724,7 @@ class Notes:
             else:
                 # Add character if not too long
                 if len(self.current_note) < self.max_note_length:
-                    if event.unicode.isprintable():
+                    if event.unicode and event.unicode.isprintable():
                         self.current_note += event.unicode
 
     def draw(self, screen, font_medium, font_small):
@@ -922,55 +3741,69 @@ class Notes:
         x_text_rect = x_text.get_rect(center=x_button_rect.center)
         screen.blit(x_text, x_text_rect)
 
+        # Draw search box
+        search_color = (50, 50, 100) if self.search_active else (30, 30, 60)
+        pygame.draw.rect(screen, search_color, self.search_rect, border_radius=10)
+        pygame.draw.rect(screen, YELLOW if self.search_active else WHITE, self.search_rect, 2, border_radius=10)
+        screen.set_clip(self.search_rect.inflate(-4, -4))
+        if self.query or self.search_active:
+            search_text = font_small.render(self.query, True, WHITE, volatile=True)
+        else:
+            search_text = font_small.render("Cauta...", True, (100, 100, 100))
+        screen.blit(search_text, (self.search_rect.x + 10,
+                                  self.search_rect.centery - search_text.get_height() // 2))
+        screen.set_clip(None)
+
         # Draw previous notes area
-        notes_area_rect = pygame.Rect(50, 90, SCREEN_WIDTH - 120, SCREEN_HEIGHT - 300)
+        notes_area_rect = self.notes_area
         pygame.draw.rect(screen, (30, 30, 60), notes_area_rect, border_radius=10)
         pygame.draw.rect(screen, WHITE, notes_area_rect, 2, border_radius=10)
 
         # Display notes
-        if self.notes:
-            y_offset = 110
-            visible_notes = self.notes[self.scroll_offset:self.scroll_offset + 5]
-            for i, note in enumerate(visible_notes):
-                # Wrap text if too long
-                max_width = SCREEN_WIDTH - 180
-                words = note.split(' ')
-                lines = []
-                current_line = ""
-
-                for word in words:
-                    test_line = current_line + " " + word if current_line else word
-                    test_surface = font_small.render(test_line, True, WHITE)
-                    if test_surface.get_width() <= max_width:
-                        current_line = test_line
-                    else:
-                        if current_line:
-                            lines.append(current_line)
-                        current_line = word
-                if current_line:
-                    lines.append(current_line)
-
-                # Draw note lines
-                for line in lines[:2]:  # Max 2 lines per note
-                    note_text = font_small.render(f"• {line}", True, WHITE)
+        if self.rows:
+            # Wrap text if too long (layout is cached per note and width)
+            max_width = SCREEN_WIDTH - 180
+            if self.layout is None or self.layout.font is not font_small:
+                self.layout = NoteLayout(font_small, max_width)
+                self.heights = None
+            self.layout.set_width(max_width)
+            if self.heights is None:
+                # Rows start with estimated heights and are measured when shown
+                self.heights = HeightIndex(self.row_height(i) for i in range(len(self.rows)))
+                self.scroll_to(self.scroll_y)
+
+            # Only the rows inside the viewport are visited
+            top = notes_area_rect.top + 20
+            clip = notes_area_rect.inflate(-4, -4)
+            screen.set_clip(clip)
+            row = self.heights.find(self.scroll_y)
+            while row < len(self.rows):
+                self.heights.set(row, self.row_height(row, measured=True))
+                y_offset = top + self.heights.offset(row) - int(self.scroll_y)
+                if y_offset > clip.bottom:
+                    break
+                for note_text in self.layout.surfaces(self.notes[self.rows[row]]):
                     screen.blit(note_text, (70, y_offset))
-                    y_offset += 40
-
-                y_offset += 10  # Space between notes
+                    y_offset += NOTE_LINE_HEIGHT
+                row += 1
+            screen.set_clip(None)
+        elif self.query.strip():
+            no_match_text = font_small.render("Nicio notita gasita.", True, (150, 150, 150))
+            screen.blit(no_match_text, (SCREEN_WIDTH // 2 - no_match_text.get_width() // 2, 200))
         else:
             no_notes_text = font_small.render("Nu exista notite inca. Adauga una mai jos!", True, (150, 150, 150))
             screen.blit(no_notes_text, (SCREEN_WIDTH // 2 - no_notes_text.get_width() // 2, 200))
 
         # Draw scroll indicators
-        if len(self.notes) > 5:
-            if self.scroll_offset > 0:
+        if self.max_scroll() > 0:
+            if self.scroll_y > 0:
                 scroll_up_rect = pygame.Rect(SCREEN_WIDTH - 60, 100, 40, 40)
                 pygame.draw.rect(screen, GREEN, scroll_up_rect, border_radius=5)
                 up_text = font_small.render("^", True, BLACK)
                 screen.blit(up_text, (scroll_up_rect.centerx - up_text.get_width() // 2,
                                      scroll_up_rect.centery - up_text.get_height() // 2))
 
-            if self.scroll_offset < len(self.notes) - 5:
+            if self.scroll_y < self.max_scroll():
                 scroll_down_rect = pygame.Rect(SCREEN_WIDTH - 60, SCREEN_HEIGHT - 250, 40, 40)
                 pygame.draw.rect(screen, GREEN, scroll_down_rect, border_radius=5)
                 down_text = font_small.render("v", True, BLACK)
@@ -986,14 +3819,14 @@ class Notes:
 
         # Draw current note text
         if self.current_note or self.input_active:
-            note_text = font_small.render(self.current_note, True, WHITE)
+            note_text = font_small.render(self.current_note, True, WHITE, volatile=True)
             screen.blit(note_text, (70, SCREEN_HEIGHT - 160))
         else:
             placeholder = font_small.render("Click aici pentru a scrie o notita...", True, (100, 100, 100))
             screen.blit(placeholder, (70, SCREEN_HEIGHT - 160))
 
         # Character counter
-        counter = font_small.render(f"{len(self.current_note)}/{self.max_note_length}", True, (150, 150, 150))
+        counter = font_small.render(f"{len(self.current_note)}/{self.max_note_length}", True, (150, 150, 150), volatile=True)
         screen.blit(counter, (SCREEN_WIDTH - 150, SCREEN_HEIGHT - 100))
 
         # Draw Add button
@@ -1009,6 +3842,607 @@ class Notes:
         screen.blit(inst, (50, SCREEN_HEIGHT - 70))
 
 
+def use_headless_display():
+    """Switch SDL to the dummy video driver, so the game draws to an off-screen surface"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    pygame.display.quit()
+    pygame.display.init()
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def frame_time_summary(times):
+    """Frame-time statistics in milliseconds"""
+    times = sorted(times)
+    return {
+        "frames": len(times),
+        "mean_ms": round(sum(times) / len(times) * 1000, 3) if times else 0.0,
+        "p50_ms": round(percentile(times, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(times, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(times, 0.99) * 1000, 3),
+        "max_ms": round(times[-1] * 1000, 3) if times else 0.0,
+    }
+
+
+class HeadlessDriver:
+    """Steps a Game frame by frame with fixed time steps and scripted input.
+
+    Every frame handles pending events, runs one SIM_DT update and draws and
+    presents the screen, timing the whole frame under the current state.
+
+    A script is a list of steps (JSON):
+        {"click": [x, y]}      mouse click
+        {"key": "space"}       key press and release
+        {"down": "left"}       hold a key, {"up": "left"} releases it
+        {"text": "abc"}        type text
+        {"frames": 60}         run frames
+    """
+    def __init__(self, game):
+        self.game = game
+        self.frame_times = {}  # state name -> seconds per frame
+        self.frame_allocations = {}  # state name -> allocations per frame
+        self.frame_collections = {}  # state name -> garbage collections per frame
+        self.frame_peaks = {}  # state name -> peak traced bytes per frame, with tracemalloc on
+
+    def send(self, event):
+        self.game.handle_events(event)
+
+    def click(self, pos):
+        self.send(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+        self.send(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos, button=1))
+
+    def key_down(self, key, text=""):
+        self.send(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=text, mod=0))
+
+    def key_up(self, key):
+        self.send(pygame.event.Event(pygame.KEYUP, key=key, mod=0))
+
+    def press(self, key, text=""):
+        self.key_down(key, text)
+        self.key_up(key)
+
+    def type_text(self, text):
+        for char in text:
+            self.press(pygame.key.key_code(" ") if char == " " else 0, char)
+
+    def step(self, frames=1, name=None):
+        """Run frames; their times are recorded under name, or the state they start in"""
+        game = self.game
+        for _ in range(frames):
+            state = name or STATE_NAMES[game.state]
+            start = self.start_frame()
+            profiler = PROFILER
+            if profiler.enabled:
+                profiler.start_frame()
+            # Background work (slide decoding) reports back through the event queue
+            for event in pygame.event.get():
+                game.handle_events(event)
+            if profiler.enabled:
+                profiler.mark("events")
+            game.update(SIM_DT)
+            game.alpha = 1.0
+            if profiler.enabled:
+                profiler.mark("update_" + STATE_NAMES[game.state])
+            dirty_rects = game.draw()
+            if profiler.enabled:
+                profiler.mark("draw_" + STATE_NAMES[game.state])
+            game.present(dirty_rects)
+            if profiler.enabled:
+                profiler.mark("present")
+            self.end_frame(state, start)
+
+    def start_frame(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        collections = sum(stats["collections"] for stats in gc.get_stats())
+        return time.perf_counter(), sum(ALLOCATIONS.values()), collections, tracemalloc.get_traced_memory()[0]
+
+    def end_frame(self, state, start):
+        """Record the time and allocations of a frame begun with start_frame()"""
+        seconds = time.perf_counter() - start[0]
+        self.frame_times.setdefault(state, []).append(seconds)
+        self.frame_allocations.setdefault(state, []).append(sum(ALLOCATIONS.values()) - start[1])
+        collections = sum(stats["collections"] for stats in gc.get_stats())
+        self.frame_collections.setdefault(state, []).append(collections - start[2])
+        if tracemalloc.is_tracing():
+            self.frame_peaks.setdefault(state, []).append(tracemalloc.get_traced_memory()[1] - start[3])
+
+    def run_script(self, steps):
+        for step in steps:
+            if "click" in step:
+                self.click(tuple(step["click"]))
+            elif "key" in step:
+                self.press(pygame.key.key_code(step["key"]))
+            elif "down" in step:
+                self.key_down(pygame.key.key_code(step["down"]))
+            elif "up" in step:
+                self.key_up(pygame.key.key_code(step["up"]))
+            elif "text" in step:
+                self.type_text(step["text"])
+            elif "frames" in step:
+                self.step(step["frames"])
+            else:
+                raise ValueError(f"Unknown script step: {step}")
+            # Input is always followed by at least one frame, like in the real loop
+            if "frames" not in step:
+                self.step()
+
+    def report(self):
+        report = {}
+        for name, times in self.frame_times.items():
+            report[name] = frame_time_summary(times)
+            allocations = self.frame_allocations[name]
+            # The first frames fill caches; steady-state frames should allocate nothing
+            steady = allocations[len(allocations) // 2:]
+            report[name]["allocations"] = sum(allocations)
+            report[name]["steady_allocations_per_frame"] = round(sum(steady) / len(steady), 3) if steady else 0.0
+            report[name]["gc_collections"] = sum(self.frame_collections[name])
+            peaks = self.frame_peaks.get(name)
+            if peaks:
+                steady = sorted(peaks[len(peaks) // 2:])
+                report[name]["steady_peak_kb_per_frame"] = round(steady[len(steady) // 2] / 1024, 1)
+        return report
+
+
+class InputRecorder:
+    """Writes the input of a session to a compact binary file for ReplayDriver.
+
+    The file starts with a header (magic, version and the marshalled seed,
+    profile names and saved progress the session started from), followed by one record per frame: the milliseconds since
+    recording started, the clock tick the frame simulated and whether it was
+    animating. The frame's input events follow it, and every
+    CHECKPOINT_INTERVAL frames a marshalled Game.snapshot() is stored.
+    """
+    HEADER = struct.Struct("<4sBI")
+    FRAME = struct.Struct("<BIHB")
+    KEY = struct.Struct("<BiHB")
+    BUTTON = struct.Struct("<BhhB")
+    MOTION = struct.Struct("<Bhh")
+    WHEEL = struct.Struct("<BhhB")
+    CHECKPOINT = struct.Struct("<BI")
+    # Record kinds; the first byte of every record
+    FRAME_KIND, CHECKPOINT_KIND = 0, 1
+    EVENT_KINDS = {pygame.KEYDOWN: 2, pygame.KEYUP: 3, pygame.MOUSEBUTTONDOWN: 4,
+                   pygame.MOUSEBUTTONUP: 5, pygame.MOUSEMOTION: 6, pygame.MOUSEWHEEL: 7,
+                   pygame.QUIT: 8}
+    EVENT_TYPES = {kind: event_type for event_type, kind in EVENT_KINDS.items()}
+
+    def __init__(self, path, seed, profiles=(), saved_state=None):
+        self.file = open(path, 'wb')
+        self.started = time.perf_counter()
+        self.frames = 0
+        meta = marshal.dumps({"seed": seed, "profiles": list(profiles),
+                              "saved_state": saved_state or {"visits": [], "decks": []}})
+        self.file.write(self.HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, len(meta)))
+        self.file.write(meta)
+
+    def frame(self, tick, animating):
+        elapsed = int((time.perf_counter() - self.started) * 1000)
+        self.file.write(self.FRAME.pack(self.FRAME_KIND, elapsed, min(tick, 0xFFFF), animating))
+
+    def event(self, event):
+        """Save an input event; screen and background events are left out"""
+        kind = self.EVENT_KINDS.get(event.type)
+        if kind is None:
+            return
+        write = self.file.write
+        if event.type in (pygame.KEYDOWN, pygame.KEYUP):
+            text = getattr(event, "unicode", "").encode("utf-8")[:255]
+            write(self.KEY.pack(kind, event.key, event.mod & 0xFFFF, len(text)) + text)
+        elif event.type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            write(self.BUTTON.pack(kind, *event.pos, event.button))
+        elif event.type == pygame.MOUSEMOTION:
+            write(self.MOTION.pack(kind, *event.pos))
+        elif event.type == pygame.MOUSEWHEEL:
+            write(self.WHEEL.pack(kind, event.x, event.y, event.flipped))
+        else:
+            write(bytes((kind,)))
+
+    def end_frame(self, game):
+        self.frames += 1
+        if self.frames % CHECKPOINT_INTERVAL == 0:
+            data = marshal.dumps(game.snapshot())
+            self.file.write(self.CHECKPOINT.pack(self.CHECKPOINT_KIND, len(data)))
+            self.file.write(data)
+
+    def close(self):
+        self.file.close()
+
+    @classmethod
+    def load(cls, path):
+        """Header values and frames of a recording.
+
+        Each frame is (milliseconds since start, tick, animating, events,
+        marshalled snapshot taken after the frame or None).
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, meta_length = cls.HEADER.unpack_from(data)
+        if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+            raise ValueError(f"{path} is not a version {RECORDING_VERSION} input recording")
+        position = cls.HEADER.size
+        meta = marshal.loads(data[position:position + meta_length])
+        position += meta_length
+
+        frames = []
+        while position < len(data):
+            kind = data[position]
+            if kind == cls.FRAME_KIND:
+                _, elapsed, tick, animating = cls.FRAME.unpack_from(data, position)
+                position += cls.FRAME.size
+                frames.append([elapsed, tick, bool(animating), [], None])
+                continue
+            if not frames:
+                raise ValueError(f"{path}: record before the first frame")
+            event_type = cls.EVENT_TYPES.get(kind)
+            if kind == cls.CHECKPOINT_KIND:
+                _, length = cls.CHECKPOINT.unpack_from(data, position)
+                position += cls.CHECKPOINT.size
+                frames[-1][4] = data[position:position + length]
+                position += length
+                continue
+            elif event_type in (pygame.KEYDOWN, pygame.KEYUP):
+                _, key, mod, length = cls.KEY.unpack_from(data, position)
+                position += cls.KEY.size
+                text = data[position:position + length].decode("utf-8", errors="replace")
+                position += length
+                event = pygame.event.Event(event_type, key=key, mod=mod, unicode=text)
+            elif event_type in (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+                _, x, y, button = cls.BUTTON.unpack_from(data, position)
+                position += cls.BUTTON.size
+                event = pygame.event.Event(event_type, pos=(x, y), button=button)
+            elif event_type == pygame.MOUSEMOTION:
+                _, x, y = cls.MOTION.unpack_from(data, position)
+                position += cls.MOTION.size
+                event = pygame.event.Event(event_type, pos=(x, y), rel=(0, 0), buttons=(0, 0, 0))
+            elif event_type == pygame.MOUSEWHEEL:
+                _, x, y, flipped = cls.WHEEL.unpack_from(data, position)
+                position += cls.WHEEL.size
+                event = pygame.event.Event(event_type, x=x, y=y, flipped=bool(flipped))
+            elif event_type == pygame.QUIT:
+                position += 1
+                event = pygame.event.Event(event_type)
+            else:
+                raise ValueError(f"{path}: unknown record kind {kind} at byte {position}")
+            frames[-1][3].append(event)
+        return meta, frames
+
+
+class ReplayDriver(HeadlessDriver):
+    """Plays an InputRecorder file back as fast as possible.
+
+    Every frame simulates the recorded clock tick, so the fixed-step
+    simulation takes the same steps as in the recorded session. Frame times
+    are collected like HeadlessDriver's, to find the frames that were slow.
+    """
+    def __init__(self, game, frames):
+        super().__init__(game)
+        self.frames = frames
+
+    def checkpoints(self):
+        return [i for i, frame in enumerate(self.frames) if frame[4] is not None]
+
+    def play(self, checkpoint=0):
+        """Replay every frame, or only those after the checkpoint-th snapshot"""
+        start = 0
+        if checkpoint:
+            checkpoints = self.checkpoints()
+            if checkpoint > len(checkpoints):
+                raise ValueError(f"The recording has only {len(checkpoints)} checkpoints")
+            start = checkpoints[checkpoint - 1]
+            self.game.restore(marshal.loads(self.frames[start][4]))
+            start += 1
+        for elapsed, tick, animating, events, snapshot in self.frames[start:]:
+            if not self.play_frame(tick, animating, events):
+                break
+
+    def play_frame(self, tick, animating, events):
+        """Run one recorded frame; False once the recording quits the game"""
+        game = self.game
+        state = STATE_NAMES[game.state]
+        start = self.start_frame()
+        # Background work (slide decoding) reports back through the event queue
+        for event in pygame.event.get():
+            game.handle_events(event)
+        running = True
+        for event in events:
+            if event.type == pygame.QUIT:
+                running = False
+            game.handle_events(event)
+        # Like Game.run, the frame that quits is still simulated and drawn
+        game.advance(tick, animating)
+        game.present(game.draw())
+        self.end_frame(state, start)
+        return running
+
+
+def replay(path, checkpoint=0):
+    """Replay a recording without a window; frame-time report as a JSON-ready dict"""
+    meta, frames = InputRecorder.load(path)
+    # Answers and notes typed during the replay must not end up in a student's files
+    folder = tempfile.mkdtemp(prefix="replay-")
+    try:
+        random.seed(meta["seed"])
+        progress = ProgressStore(os.path.join(folder, "progress.db"))
+        for profile in meta["profiles"]:
+            progress.add_profile(profile)
+        progress.load_saved_state(meta["saved_state"])
+        game = Game(progress, notes_root=folder)
+        driver = ReplayDriver(game, frames)
+        driver.play(checkpoint)
+        game.progress.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {
+        "seed": meta["seed"],
+        "frames": len(frames),
+        "checkpoints": len(driver.checkpoints()),
+        "checkpoint": checkpoint,
+        "final_state": STATE_NAMES[game.state],
+        "results": driver.report(),
+    }
+
+
+def benchmark_exploration(driver, frames, planet_count):
+    game = driver.game
+    rng = random.Random(planet_count)
+    for i in range(planet_count - len(game.planets)):
+        x = rng.randint(-CHUNK_SIZE * 2, CHUNK_SIZE * 3)
+        y = rng.randint(-CHUNK_SIZE * 2, CHUNK_SIZE * 3)
+        game.add_planet(Planet(f"P{i}", x, y, rng.randint(20, 80), (120, 120, 200)))
+    game.state = EXPLORATION
+    for key in (pygame.K_RIGHT, pygame.K_DOWN, pygame.K_LEFT, pygame.K_UP):
+        driver.key_down(key)
+        driver.step(frames // 4, f"exploration_{planet_count}_planets")
+        driver.key_up(key)
+
+
+def benchmark_quiz(driver, frames):
+    game = driver.game
+    planet = next(planet for planet in game.planets if planet.questions)
+    game.current_planet = planet
+    game.state = INFO
+    done = 0
+    while done < frames:
+        if game.state != QUIZ:
+            game.state = INFO
+            driver.press(pygame.K_SPACE)
+        # Read for a while, answer, read the result, go on
+        driver.step(5, "quiz")
+        driver.click((SCREEN_WIDTH // 2, 325 + 70 * random.randrange(4)))
+        driver.step(5, "quiz")
+        driver.press(pygame.K_SPACE)
+        done += 10
+
+
+def benchmark_dodge(driver, frames, asteroid_count):
+    game = driver.game
+    name = f"dodge_{asteroid_count}_asteroids"
+    # Asteroids cross the screen in about three seconds
+    spawn_rate = 0.1
+    spawn_count = max(1, round(asteroid_count * spawn_rate / 3))
+    planet = next(planet for planet in game.planets if planet.questions)
+    done = 0
+    while done < frames:
+        game.state = DODGE
+        game.current_planet = planet
+        game.dodge_game = DodgeGame(game.starfield, spawn_rate, spawn_count,
+                                    random.Random(random.getrandbits(64)))
+        game.dodge_game.duration = 1e9  # rounds only end on a hit
+        for _ in range(asteroid_count):
+            game.dodge_game.asteroids.spawn(random.randint(20, SCREEN_WIDTH - 20),
+                                            random.uniform(-20, SCREEN_HEIGHT - 200),
+                                            random.randint(15, 35), random.uniform(180, 420))
+        key = random.choice((pygame.K_LEFT, pygame.K_RIGHT))
+        driver.key_down(key)
+        while done < frames and not game.dodge_game.finished:
+            driver.step(1, name)
+            done += 1
+        driver.key_up(key)
+
+
+def benchmark_notes(driver, frames, note_count):
+    game = driver.game
+    folder = tempfile.mkdtemp(prefix="notes-benchmark-")
+    try:
+        snapshot = os.path.join(folder, "student_notes.json")
+        with open(snapshot, 'w', encoding='utf-8') as f:
+            json.dump([f"Notita {i}: " + "planeta " * (i % 12) for i in range(note_count)], f)
+        game.state = NOTES
+        game.notes = Notes(NoteStore(snapshot))
+        name = f"notes_{note_count}_entries"
+        for i in range(frames // 10):
+            wheel = -3 if (i // 20) % 2 == 0 else 3
+            driver.send(pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=wheel, flipped=False))
+            driver.step(10, name)
+        game.notes.close()
+        game.notes = None
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def benchmark_slideshow(driver, frames):
+    game = driver.game
+    game.state = SLIDESHOW
+    game.slideshow = Slideshow(game.slide_loader)
+    step = 1
+    for i in range(frames // 20):
+        driver.step(20, "slideshow")
+        # Page to the last slide and back, so every change prefetches a new neighbour
+        slideshow = game.slideshow
+        if not 0 <= slideshow.current_slide + step < len(slideshow.paths):
+            step = -step
+        driver.click((Slideshow.NEXT_BUTTON if step > 0 else Slideshow.PREV_BUTTON).center)
+    game.slide_loader.retain([])
+
+
+def run_benchmarks(frames=300, seed=0, sizes=(10, 1000), trace_allocations=False):
+    """Frame-time percentiles for each game screen, as a JSON-ready dict.
+
+    trace_allocations adds the median peak of Python memory allocated per
+    frame, from tracemalloc; tracing slows every frame down.
+    """
+    results = {}
+    load_numpy()
+    if trace_allocations:
+        tracemalloc.start()
+    # Answers and dodge results of the benchmark must not end up in a student's progress
+    folder = tempfile.mkdtemp(prefix="progress-benchmark-")
+
+    def scenario(run, *args):
+        random.seed(seed)
+        game = Game(ProgressStore(os.path.join(folder, "progress.db")))
+        driver = HeadlessDriver(game)
+        run(driver, frames, *args)
+        game.progress.close()
+        results.update(driver.report())
+
+    try:
+        scenario(lambda driver, frames: driver.step(frames, "menu"))
+        for count in sizes:
+            scenario(benchmark_exploration, count)
+        scenario(benchmark_quiz)
+        # Storm levels fill the screen with thousands of asteroids
+        for count in sizes + (DODGE_STORM_ASTEROIDS,):
+            scenario(benchmark_dodge, count)
+        for count in sizes:
+            scenario(benchmark_notes, count * 10)
+        scenario(benchmark_slideshow)
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        if trace_allocations:
+            tracemalloc.stop()
+    return {
+        "python": sys.version.split()[0],
+        "pygame": pygame.version.ver,
+        "video_driver": pygame.display.get_driver(),
+        "seed": seed,
+        "frames": frames,
+        "numpy": numpy.__version__ if numpy is not None else None,
+        "trace_allocations": trace_allocations,
+        "results": results,
+    }
+
+
+def startup_report():
+    return dict(STARTUP.report(), video_driver=pygame.display.get_driver())
+
+
+def write_report(report, output=None):
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def window_size(text):
+    """Parse a WIDTHxHEIGHT command line value"""
+    try:
+        width, height = (int(part) for part in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected WIDTHxHEIGHT, e.g. 1280x800")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("the window size must be positive")
+    return width, height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sa invatam planetele")
+    parser.add_argument("--headless", action="store_true", help="run without a window (SDL dummy driver)")
+    parser.add_argument("--seed", type=int, help="seed the random generator for a repeatable game")
+    parser.add_argument("--script", help="play a JSON input script instead of reading the keyboard")
+    parser.add_argument("--benchmark", action="store_true", help="print frame-time percentiles per screen as JSON")
+    parser.add_argument("--frames", type=int, default=300, help="frames per benchmark scenario")
+    parser.add_argument("--trace-allocations", action="store_true",
+                        help="add the Python memory allocated per frame to the benchmark (slower frames)")
+    parser.add_argument("--output", help="write the script or benchmark report to this file")
+    parser.add_argument("--trace", help="record frame phases to this Chrome trace-event JSON file")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="print the time of each startup phase as JSON once the menu is shown")
+    parser.add_argument("--window", type=window_size, metavar="WxH",
+                        help="window size; the 1024x768 game is scaled to fit it")
+    parser.add_argument("--fullscreen", action="store_true", help="fill the screen at its native resolution")
+    parser.add_argument("--record", metavar="FILE", help="save the input of this session for --replay")
+    parser.add_argument("--replay", metavar="FILE", help="play a --record file back without a window")
+    parser.add_argument("--validate-content", nargs="?", const=CONTENT_DIR, metavar="FOLDER",
+                        help="check the quiz banks and report answer statistics as JSON")
+    parser.add_argument("--progress-db", default=PROGRESS_FILE, help="progress database read by --validate-content")
+    parser.add_argument("--checkpoint", type=int, default=0,
+                        help="start the replay from this state snapshot (0 replays from the start)")
+    args = parser.parse_args(argv)
+    display = {"display_size": args.window, "fullscreen": args.fullscreen}
+
+    if args.headless or args.benchmark or args.replay:
+        use_headless_display()
+    if args.record and args.seed is None:
+        # A recording needs a known seed to be replayed
+        args.seed = random.randrange(2 ** 32)
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.trace:
+        PROFILER.start_trace()
+
+    report = None
+    if args.validate_content:
+        report = validate_content(args.validate_content, args.progress_db)
+        write_report(report, args.output)
+        # A failing exit status lets a content check stop a release
+        sys.exit(1 if report["errors"] else 0)
+    if args.profile_startup:
+        game = Game(**display)
+        if not args.headless:
+            # run() exits the process, so the report is written before quitting
+            def menu_ready():
+                write_report(startup_report(), args.output)
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+            game.on_menu_ready = menu_ready
+            game.run(args.trace)
+        driver = HeadlessDriver(game)
+        while not STARTUP.done:
+            driver.step(1)
+        game.progress.close()
+        report = startup_report()
+    elif args.benchmark:
+        report = run_benchmarks(args.frames, args.seed or 0, trace_allocations=args.trace_allocations)
+    elif args.replay:
+        try:
+            report = replay(args.replay, args.checkpoint)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+    elif args.script:
+        with open(args.script, 'r', encoding='utf-8') as f:
+            steps = json.load(f)
+        # Answers and notes of a script must not end up in a student's files
+        folder = tempfile.mkdtemp(prefix="script-")
+        try:
+            game = Game(ProgressStore(os.path.join(folder, "progress.db")), notes_root=folder, **display)
+            driver = HeadlessDriver(game)
+            driver.run_script(steps)
+            game.progress.close()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        report = {"seed": args.seed, "final_state": STATE_NAMES[game.state], "results": driver.report()}
+    else:
+        game = Game(**display)
+        if args.record:
+            game.recorder = InputRecorder(args.record, args.seed, game.progress.profile_names(),
+                                          game.progress.saved_state())
+        game.run(args.trace)
+        return
+    if args.trace:
+        PROFILER.save_trace(args.trace)
+
+    write_report(report, args.output)
+
+
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    main()